@@ -14,6 +14,7 @@ def prepare(metadata: dict) -> list:
     problems = list(map(Problem, metadata['problems']))
     for problem in problems:
         problem.prepare()
+        problem.warm(int(metadata.get('warm_seeds', Constants.cache['reference']['warm_seeds'])))
 
     return problems
 
@@ -1,4 +1,5 @@
 import logging
+import time
 from datetime import datetime
 
 import fetch
@@ -21,8 +22,26 @@ if __name__ == "__main__":
     metadata = UTIL.get_metadata()
     contest = metadata["contest"]
     problems = UTIL.prepare(metadata)
-    hackable_submissions = fetch.fetch_all_hackable_submissions_using_api(contest)
 
-    hacker = Hacker(metadata, problems, hackable_submissions)
+    interval = metadata.get("daemon", 0)
+    if interval > 0:
+        # Keep polling the running contest and hack new submissions as soon as they pass pretests,
+        # with the references compiled and the caches warm from one batch to the next
+        poller = fetch.StatusPoller(contest)
+        hacker = Hacker(metadata, problems, [])
 
-    hacker.run()
\ No newline at end of file
+        while True:
+            hacker.hackable_submissions = poller.poll()
+            if hacker.hackable_submissions:
+                hacker.run(purge=False)
+                if hacker.scheduler.spent():
+                    logging.info("The budget is spent, stopping")
+                    break
+            else:
+                time.sleep(interval)
+    else:
+        hackable_submissions = fetch.fetch_all_hackable_submissions_using_api(contest)
+
+        hacker = Hacker(metadata, problems, hackable_submissions)
+
+        hacker.run()
\ No newline at end of file
@@ -0,0 +1,17 @@
+import java.io.*;
+import java.util.*;
+
+public class Main {
+    public static void main(String[] args) throws IOException {
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));
+        StringBuilder out = new StringBuilder();
+        int t = Integer.parseInt(in.readLine().trim());
+        while (t-- > 0) {
+            StringTokenizer line = new StringTokenizer(in.readLine());
+            long sum = 0;
+            while (line.hasMoreTokens()) sum += Long.parseLong(line.nextToken());
+            out.append(sum).append('\n');
+        }
+        System.out.print(out);
+    }
+}
@@ -0,0 +1,12 @@
+import java.util.*;
+
+public class Main {
+    public static void main(String[] args) {
+        Scanner in = new Scanner(System.in);
+        int t = in.nextInt();
+        while (t-- > 0) {
+            int a = in.nextInt(), b = in.nextInt(), c = in.nextInt();
+            System.out.println(a + b + c);
+        }
+    }
+}
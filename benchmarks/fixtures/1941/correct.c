@@ -0,0 +1,12 @@
+#include <stdio.h>
+
+int main() {
+    int t;
+    scanf("%d", &t);
+    while (t--) {
+        long long a, b, c;
+        scanf("%lld %lld %lld", &a, &b, &c);
+        printf("%lld\n", a + b + c);
+    }
+    return 0;
+}
@@ -0,0 +1,5 @@
+import sys
+
+data = sys.stdin.buffer.read().split()
+t = int(data[0])
+print('\n'.join(str(int(data[i]) + int(data[i + 1]) + int(data[i + 2])) for i in range(1, 3 * t + 1, 3)))
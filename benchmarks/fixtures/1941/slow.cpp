@@ -0,0 +1,14 @@
+#include <bits/stdc++.h>
+using namespace std;
+
+int main() {
+    int t;
+    cin >> t;
+    while (t--) {
+        long long a, b, c;
+        cin >> a >> b >> c;
+        volatile long long steps = 0;
+        for (long long i = 0; i < c % 1000000; i++) steps = steps + 1;
+        cout << a + b + (c - c % 1000000) + steps << endl;
+    }
+}
@@ -0,0 +1,5 @@
+t = int(input())
+for _ in range(t):
+    a, b, c = map(int, input().split())
+    s = (a + b + c) % 2**32
+    print(s - 2**32 if s >= 2**31 else s)
@@ -0,0 +1,21 @@
+#include <cstdio>
+#include <vector>
+
+// A depth-first search down a path of a million vertices, far deeper than a default 8 MB stack allows
+std::vector<std::vector<int>> children;
+std::vector<int> depth, order;
+
+void dfs(int v, int d) {
+    depth[v] = d;
+    for (int u : children[v]) dfs(u, d + 1);
+    order.push_back(v);  // Post-order, so the calls cannot be turned into a loop
+}
+
+int main() {
+    int n = 1000000;
+    children.resize(n);
+    depth.resize(n);
+    for (int v = 1; v < n; v++) children[v - 1].push_back(v);
+    dfs(0, 0);
+    printf("%d %d\n", depth[order[0]], order.back());
+}
@@ -0,0 +1,7 @@
+#include <cstdio>
+#include <vector>
+
+int main() {
+    std::vector<char> memory(512 << 20, 1);
+    printf("%d\n", memory[12345]);
+}
@@ -0,0 +1,6 @@
+#include <cstdio>
+
+int main() {
+    volatile unsigned long long x = 0;
+    while (true) x++;
+}
@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+"""
+Throughput of the input generators: seeds/sec, bytes/sec and peak memory of
+every registered generator (or the ones named) over a fixed seed range.
+
+Each generator runs in a process of its own, so that peak memory is its own
+and generators seeding the global random module do not disturb each other.
+Results are appended to a JSON lines file together with the git revision;
+--compare reports the change against the previous result for the same
+generator, seed range and backend and fails if any got slower than
+--tolerance allows.
+
+Usage (from the repository root):
+    python3 -m benchmarks.generators [--seeds 20] [--first 1] [--profile] [--compare]
+                                     [--tolerance 0.1] [GENERATOR ...]
+"""
+
+import argparse
+import cProfile
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import pstats
+import resource
+import subprocess
+import sys
+import time
+
+from config import Constants
+from judge import generator as generators
+from judge.spec import Spec
+
+
+def registered() -> list:
+    bases = (generators.Generator, generators.SpecGenerator, generators.NativeGenerator)
+    return [
+        name for name, member in vars(generators).items()
+        if isinstance(member, type) and issubclass(member, generators.Generator) and member not in bases
+    ]
+
+
+def revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return 'unknown'
+
+
+def measure(name: str, first: int, seeds: int, profile: bool, connection):
+    try:
+        generator = generators.Generator.get_generator(name)()
+        profiler = cProfile.Profile() if profile else None
+
+        size = 0
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        for seed in range(first, first + seeds):
+            size += len(generator.generate(seed))
+        if profiler is not None:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        # Native generators run in a child of their own
+        peak = max(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        )
+
+        result = {
+            'generator': name,
+            'fingerprint': generator.fingerprint(),
+            'backend': Spec.backend,
+            'first': first,
+            'seeds': seeds,
+            'seconds': elapsed,
+            'seeds_per_second': seeds / elapsed,
+            'bytes_per_second': size / elapsed,
+            'peak_memory': peak,
+            'profiled': profiler is not None,
+        }
+        if profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(15)
+            result['profile'] = stream.getvalue()
+
+        connection.send(result)
+    except Exception as e:
+        connection.send({'generator': name, 'error': repr(e)})
+    finally:
+        connection.close()
+
+
+def run(name: str, first: int, seeds: int, profile: bool) -> dict:
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=measure, args=(name, first, seeds, profile, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {'generator': name, 'error': f'exited with status {process.exitcode}'}
+    process.join()
+    return result
+
+
+def previous(history: str, result: dict):
+    if not os.path.exists(history):
+        return None
+
+    match = None
+    with open(history) as file:
+        for line in file:
+            record = json.loads(line)
+            # Profiled runs are slower, so they are only compared with each other
+            if all(record.get(key) == result[key] for key in ('generator', 'backend', 'first', 'seeds', 'profiled')):
+                match = record
+    return match
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('generators', nargs='*', help='generator class names or source files, all registered ones by default')
+    parser.add_argument('--first', type=int, default=1, help='first seed')
+    parser.add_argument('--seeds', type=int, default=20, help='number of seeds per generator')
+    parser.add_argument('--profile', action='store_true', help='print a cProfile breakdown per generator')
+    parser.add_argument('--compare', action='store_true', help='compare against the previous results')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown in seeds/sec accepted by --compare')
+    parser.add_argument('--history', default=os.path.join(Constants.cache['directory'], 'benchmarks', 'generators.jsonl'))
+    args = parser.parse_args()
+
+    names = args.generators or registered()
+    timestamp = datetime.datetime.now().isoformat(timespec='seconds')
+    commit = revision()
+    regressions = []
+
+    print(f"{'generator':<20}{'seeds/s':>10}{'MB/s':>10}{'peak MB':>10}{'change':>10}")
+    results = []
+    for name in names:
+        result = run(name, args.first, args.seeds, args.profile)
+        if 'error' in result:
+            print(f"{name:<20}failed: {result['error']}")
+            continue
+
+        change = ''
+        if args.compare:
+            baseline = previous(args.history, result)
+            if baseline is not None:
+                ratio = result['seeds_per_second'] / baseline['seeds_per_second'] - 1
+                change = f"{ratio:+.1%}"
+                if ratio < -args.tolerance:
+                    regressions.append(f"{name}: {ratio:+.1%} against {baseline['revision']}")
+
+        print(
+            f"{name:<20}{result['seeds_per_second']:>10.2f}{result['bytes_per_second'] / 2**20:>10.2f}"
+            f"{result['peak_memory'] / 1024:>10.1f}{change:>10}"
+        )
+        if 'profile' in result:
+            print(result.pop('profile'))
+
+        result.update(timestamp=timestamp, revision=commit)
+        results.append(result)
+
+    os.makedirs(os.path.dirname(args.history), exist_ok=True)
+    with open(args.history, 'a') as file:
+        for result in results:
+            file.write(json.dumps(result) + '\n')
+
+    if regressions:
+        print("Slower than before:\n" + '\n'.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
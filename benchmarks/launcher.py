@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""
+Per-run overhead of starting a submission: subprocess.run (what Executor.exec
+used to do, without any measurement) against judge.launcher.launch, which also
+runs the command under its limits and reports its CPU time and peak memory.
+For the large input it is timed both with the input as bytes and as a shared
+launcher.Input, which is how every run of a seed gets it.
+
+Usage (from the repository root):
+    python3 -m benchmarks.launcher [--runs 500] [--size 1048576]
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from judge import launcher
+
+# Copies stdin to stdout, so the measured time is almost entirely harness overhead
+CAT = '#include <stdio.h>\nint main(){char b[65536];size_t n;while((n=fread(b,1,sizeof b,stdin))>0)fwrite(b,1,n,stdout);return 0;}\n'
+
+
+def with_subprocess(executable: str, stdin: str, cwd: str):
+    subprocess.run([executable], capture_output=True, check=True, cwd=cwd, input=stdin, text=True, timeout=10)
+
+
+def with_launcher(executable: str, stdin, cwd: str):
+    launcher.launch([executable], stdin, 10)
+
+
+def measure(runner, executable: str, stdin: str, cwd: str, runs: int) -> float:
+    runner(executable, stdin, cwd)  # Warm up
+    start = time.perf_counter()
+    for _ in range(runs):
+        runner(executable, stdin, cwd)
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=500)
+    parser.add_argument('--size', type=int, default=1 << 20, help='bytes of stdin for the large-input case')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        executable = os.path.join(directory, 'cat')
+        subprocess.run(['gcc', '-O2', '-xc', '-', '-o', executable], input=CAT, text=True, check=True)
+
+        line = '1 2 3\n'
+        inputs = {'small': line, 'large': line * (args.size // len(line))}
+
+        print(f"{'input':<16}{'subprocess.run':>18}{'launcher':>14}{'speedup':>10}")
+        for name, stdin in inputs.items():
+            runs = args.runs if name == 'small' else max(1, args.runs // 10)
+            before = measure(with_subprocess, executable, stdin, directory, runs)
+            after = measure(with_launcher, executable, stdin.encode(), directory, runs)
+            print(f"{name:<16}{before * 1e6:>15.0f} us{after * 1e6:>11.0f} us{before / after:>9.2f}x")
+
+            if name == 'large':
+                with launcher.Input(stdin.encode()) as shared:
+                    after = measure(with_launcher, executable, shared, directory, runs)
+                print(f"{'large (shared)':<16}{before * 1e6:>15.0f} us{after * 1e6:>11.0f} us{before / after:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
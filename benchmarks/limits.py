@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+"""
+Regression check for the limits submissions run under: each program in
+benchmarks/fixtures/limits is compiled and run through Executor.run with
+Codeforces-like limits, and its verdict must be the expected one. A wrong
+verdict is worse than a slow one, since a correct submission judged RE or MLE
+is counted as hacked.
+
+Usage (from the repository root):
+    python3 -m benchmarks.limits
+"""
+
+import os
+import sys
+import tempfile
+
+from config import Constants
+from judge.remo import Remo
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'limits')
+
+# Program, expected verdict
+CASES = [
+    ('deep.cpp', 'success'),  # Recursion a million calls deep needs far more than an 8 MB stack
+    ('hog.cpp', 'MLE'),
+    ('spin.cpp', 'TLE'),
+]
+
+
+def main():
+    failed = 0
+    language = next(language for language in Constants.setup['ALLOWED_LANGUAGES'] if language['MAPPING'] == 'CPP')
+    with tempfile.TemporaryDirectory() as directory:
+        for source_file, expected in CASES:
+            with open(os.path.join(FIXTURES, source_file)) as file:
+                source = file.read()
+
+            program = Remo({
+                "lang": dict(language),
+                "source": source,
+                "source_file_name": source_file,
+                "path": directory,
+                "executable": f"{os.path.splitext(source_file)[0]}_exe",
+                "time_limit": 2,
+                "memory_limit": 256 * 1024,
+            })
+            response = program.run('')
+            status = response['status']
+            print(f"{source_file:<12}{status:<10}{'ok' if status == expected else f'expected {expected}'}")
+            if status != expected:
+                failed += 1
+                print(response.get('message', ''))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+"""
+End-to-end throughput of the hacker against a local stand-in for Codeforces.
+
+The stand-in serves contest.status (with from/count paging), user.info and
+submission pages from a fixture set: the submissions of a real contest
+(benchmarks/fixtures/1941 reuses audit/1941) with their sources replaced by
+a few variants per language of a toy problem, some correct and some not.
+The whole pipeline then runs as app.py would (fetch, Problem.prepare,
+Hacker.run) in a scratch directory, and the benchmark reports submissions
+judged per hour, seeds per second and the time to the first hack.
+
+Usage (from the repository root):
+    python3 -m benchmarks.standin [--submissions 20] [--timeout 5] [--workers 1]
+                                  [--budget 0] [--epsilon 0] [--triage 0]
+                                  [--cache DIR] [--fixture benchmarks/fixtures/1941]
+"""
+
+import argparse
+import hashlib
+import html
+import http.server
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from config import Constants
+import fetch
+import UTIL
+from hack import Hacker
+from store import SourceStore
+
+PAGE = '''<html>
+<body>
+<a href="/profile/{handle}">{handle}</a>
+<a href="/contest/{contest_id}/problem/{problem}">{problem}</a>
+<td>{language}</td>
+<span class="verdict-accepted">Accepted</span>
+<pre id="program-source-text" class="prettyprint">{source}</pre>
+</body>
+</html>
+'''
+
+
+class StandIn(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixture: str, address: tuple = ('127.0.0.1', 0)):
+        self.fixture = fixture
+        with open(os.path.join(fixture, 'manifest.json')) as file:
+            self.manifest = json.load(file)
+        with open(self.manifest['contest_status']) as file:
+            submissions = json.load(file)
+
+        self.status = json.dumps({'status': 'OK', 'result': submissions}).encode()
+        self.listing = submissions
+        self.submissions = {submission['id']: submission for submission in submissions}
+        self.extensions = {language['LANGUAGE']: language['EXTENSION'] for language in Constants.setup['ALLOWED_LANGUAGES']}
+        super().__init__(address, Handler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def read(self, source_file: str) -> str:
+        with open(os.path.join(self.fixture, source_file)) as file:
+            return file.read()
+
+    @staticmethod
+    def rating(handle: str) -> int:
+        # Made up, but the same for a handle on every run
+        return 800 + int(hashlib.sha1(handle.encode()).hexdigest(), 16) % 2400
+
+    def page(self, contest_id: int, submission_id: int) -> str:
+        reference = self.manifest['reference']
+        if submission_id == reference['submission_id']:
+            handle, problem, language = reference['handle'], self.manifest['problem']['code'], reference['language']
+            source = self.read(reference['source'])
+        elif submission_id in self.submissions:
+            submission = self.submissions[submission_id]
+            handle = submission['author']['members'][0]['handle']
+            problem = submission['problem']['index']
+            language = submission['programmingLanguage']
+            variants = self.manifest['variants'].get(self.extensions.get(language), [])
+            if not variants:
+                return None
+            source = self.read(variants[submission_id % len(variants)])
+        else:
+            return None
+
+        return PAGE.format(
+            handle=handle, contest_id=contest_id, problem=problem, language=language, source=html.escape(source)
+        )
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        submission = re.fullmatch(r'/contest/(\d+)/submission/(\d+)', url.path)
+
+        if url.path == '/api/contest.status':
+            query = urllib.parse.parse_qs(url.query)
+            if 'from' in query or 'count' in query:
+                start = int(query.get('from', ['1'])[0]) - 1
+                count = int(query.get('count', [len(self.server.listing)])[0])
+                page = {'status': 'OK', 'result': self.server.listing[start:start + count]}
+                self.reply(200, 'application/json', json.dumps(page).encode())
+            else:
+                self.reply(200, 'application/json', self.server.status)
+        elif url.path == '/api/user.info':
+            handles = urllib.parse.parse_qs(url.query).get('handles', [''])[0].split(';')
+            users = [{'handle': handle, 'rating': self.server.rating(handle)} for handle in handles if handle]
+            self.reply(200, 'application/json', json.dumps({'status': 'OK', 'result': users}).encode())
+        elif submission is not None:
+            page = self.server.page(int(submission.group(1)), int(submission.group(2)))
+            if page is None:
+                self.reply(404, 'text/html', b'Not Found')
+            else:
+                self.reply(200, 'text/html; charset=utf-8', page.encode())
+        else:
+            self.reply(404, 'text/html', b'Not Found')
+
+    def reply(self, code: int, content_type: str, body: bytes):
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TimedHacker(Hacker):
+    """
+    A Hacker that keeps every verdict and when it arrived
+    """
+
+    def __init__(self, metadata: dict, problems: list, hackable_submissions: list, start: float):
+        super().__init__(metadata, problems, hackable_submissions)
+        self.start = start
+        self.verdicts = []
+        self.first_hack = None
+
+    def record(self, submission_id: int, verdict: dict):
+        super().record(submission_id, verdict)
+        self.verdicts.append(verdict)
+        if verdict['status'] == 'hacked' and self.first_hack is None:
+            self.first_hack = time.perf_counter() - self.start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixture', default=os.path.join('benchmarks', 'fixtures', '1941'))
+    parser.add_argument('--submissions', type=int, default=20, help='number of submissions to judge')
+    parser.add_argument('--timeout', type=int, default=5, help='seconds of stress testing per submission')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--budget', type=int, default=0, help='total seconds of hacking, see scheduler.Scheduler')
+    parser.add_argument('--epsilon', type=float, default=0, help='stop a submission early, see scheduler.Scheduler')
+    parser.add_argument('--triage', type=int, default=0, help='seeds of the triage run of every submission, see hack.Hacker')
+    parser.add_argument('--cache', help='cache directory to reuse across runs, a fresh one by default')
+    args = parser.parse_args()
+
+    server = StandIn(os.path.abspath(args.fixture))
+    threading.Thread(target=server.serve_forever, name='stand-in', daemon=True).start()
+
+    cache = os.path.abspath(args.cache) if args.cache else None
+    directory = tempfile.mkdtemp(prefix='standin_')
+    os.chdir(directory)
+
+    logging.basicConfig(
+        format="%(asctime)s,%(msecs)03d %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s",
+        datefmt="%Y-%m-%d:%H:%M:%S",
+        level=logging.INFO,
+        filename='standin.log',
+        filemode='w',
+    )
+
+    Constants.cache['directory'] = cache or os.path.join(directory, 'cache')
+    fetch.base_url = server.url
+    fetch.minimum_gap = 0
+    fetch.store = SourceStore(os.path.join(Constants.cache['directory'], 'sources.db'))
+
+    reference = server.manifest['reference']
+    contest = str(server.submissions[next(iter(server.submissions))]['contestId'])
+    metadata = {
+        'contest': contest,
+        'timeout': args.timeout,
+        'workers': args.workers,
+        'budget': args.budget,
+        'epsilon': args.epsilon,
+        'triage_seeds': args.triage,
+        'problems': [
+            {
+                **server.manifest['problem'],
+                'reference_submission': f"{server.url}/contest/{contest}/submission/{reference['submission_id']}",
+            }
+        ],
+    }
+    # fetch reads the problems to keep from metadata.json
+    with open('metadata.json', 'w') as file:
+        json.dump(metadata, file, indent=4)
+
+    start = time.perf_counter()
+    problems = UTIL.prepare(metadata)
+    hackable_submissions = fetch.fetch_all_hackable_submissions_using_api(contest)[: args.submissions]
+    hacker = TimedHacker(metadata, problems, hackable_submissions, start)
+    hacker.run()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    judged = len(hacker.verdicts)
+    hacked = sum(verdict['status'] == 'hacked' for verdict in hacker.verdicts)
+    seeds = sum(verdict.get('seeds', 0) for verdict in hacker.verdicts)
+    first_hack = f"{hacker.first_hack:.1f} s" if hacker.first_hack is not None else 'never'
+
+    print(f"{'submissions judged':<24}{judged:>12}")
+    print(f"{'hacked':<24}{hacked:>12}")
+    print(f"{'wall time':<24}{elapsed:>10.1f} s")
+    print(f"{'submissions per hour':<24}{judged / elapsed * 3600:>12.0f}")
+    print(f"{'seeds per second':<24}{seeds / elapsed:>12.2f}")
+    print(f"{'time to first hack':<24}{first_hack:>12}")
+    print(f"Logs and hack log are in {directory}")
+
+
+if __name__ == '__main__':
+    main()
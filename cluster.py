@@ -0,0 +1,105 @@
+import ast
+import collections
+import hashlib
+import logging
+import re
+import threading
+
+LITERALS = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+# String and character literals are kept as they are, comments are dropped
+C_LIKE_TOKENS = re.compile(LITERALS + r'|//[^\n]*|/\*.*?\*/', re.S)
+
+
+def squeeze(code: str) -> str:
+    # Spacing around brackets and separators never changes the meaning, unlike around operators (a - -b)
+    code = re.sub(r'\s+', ' ', code)
+    return re.sub(r' ?([(){}\[\];,]) ?', r'\1', code).strip()
+
+
+def normalize(source: str, extension: str) -> str:
+    """
+    The source without comments and formatting
+    """
+    if extension == '.py':
+        try:
+            return ast.dump(ast.parse(source))
+        except SyntaxError:
+            pass
+
+    source = C_LIKE_TOKENS.sub(lambda match: ' ' if match.group(0)[0] == '/' else match.group(0), source)
+    # Code and literals alternate, literals are left alone
+    parts = re.split(f'({LITERALS})', source)
+    return ''.join(part if index % 2 else squeeze(part) for index, part in enumerate(parts))
+
+
+def keys(problem, submission) -> list:
+    """
+    Submissions sharing any of these keys are judged alike: the same problem
+    and limits, and either the same normalized source or the same binary
+    """
+    limits = f"{problem.code}:{submission.language['MAPPING']}:{submission.time_limit}:{submission.memory_limit}"
+    source = normalize(submission.source, submission.language['EXTENSION'])
+    return [
+        f"{limits}:source:{hashlib.sha1(source.encode()).hexdigest()}",
+        f"{limits}:binary:{submission.executor.digest()}",
+    ]
+
+
+class Clusters:
+    """
+    Submissions that would be judged the same way.
+
+    The first submission of a cluster is its representative and is the only
+    one stress-tested; its verdict is copied to the other members, including
+    those that joined while it was still being judged in the worker pool.
+    """
+
+    def __init__(self):
+        self.representatives = {}
+        self.verdicts = {}
+        self.waiting = collections.defaultdict(list)
+        self.lock = threading.Lock()
+
+    def join(self, keys: list, submission_id) -> tuple:
+        """
+        Add a submission. Returns (representative, verdict): (None, None) if
+        it starts a cluster of its own and must be judged, otherwise the verdict
+        of its representative, or None if that is still being judged (the member
+        is then handed out by resolve).
+        """
+        with self.lock:
+            representative = next((self.representatives[key] for key in keys if key in self.representatives), None)
+            for key in keys:
+                self.representatives.setdefault(key, representative or submission_id)
+
+            if representative is None:
+                return None, None
+
+            verdict = self.verdicts.get(representative)
+            if verdict is None:
+                self.waiting[representative].append(submission_id)
+            return representative, verdict
+
+    def resolve(self, submission_id, verdict: dict) -> list:
+        """
+        Store the verdict of a submission, returns the members that waited for it
+        """
+        with self.lock:
+            self.verdicts[submission_id] = verdict
+            return self.waiting.pop(submission_id, [])
+
+    def abandon(self, submission_id) -> list:
+        """
+        The submission could not be judged, returns the members that waited for it
+        """
+        with self.lock:
+            # Later members start a cluster of their own instead of waiting for nothing
+            self.representatives = {
+                key: representative for key, representative in self.representatives.items() if representative != submission_id
+            }
+            return self.waiting.pop(submission_id, [])
+
+    @staticmethod
+    def copy(verdict: dict, submission_id, representative) -> dict:
+        logging.info(f"Submission {submission_id} is judged like submission {representative}")
+        return {**verdict, "submission_id": submission_id, "representative": representative}
@@ -1,9 +1,26 @@
+import collections
 import io
+import logging
+import multiprocessing
+import os
 import random
+import tempfile
+import traceback
 
 import fetch
+from judge.cache import ReferenceCache
+from judge.checker import Checker
+from judge.corpus import Corpus
 from judge.remo import Remo
-from judge.generator import Generator
+from judge.generator import Generator, Validator
+
+
+def workspace(submission_id) -> str:
+    # Every submission is built in a directory of its own so that
+    # parallel workers never clash on file names (e.g. Java's Main.class)
+    path = os.path.join(tempfile.gettempdir(), str(submission_id))
+    os.makedirs(path, exist_ok=True)
+    return path
 
 
 class Problem:
@@ -27,10 +44,10 @@ class Problem:
         args = {
             "lang": self.reference_submission.language,
             "source": self.reference_submission.source,
-            "time_limit": int(self.time_limit),
+            "time_limit": float(self.time_limit),
             "memory_limit": int(self.memory_limit) * 1024,  # Convert to KB
             "source_file_name": f"{self.reference_submission.submission_id}{self.reference_submission.language['EXTENSION']}",
-            "path": "/tmp/",
+            "path": workspace(self.reference_submission.submission_id),
             "executable": f"{self.reference_submission.submission_id}_exe"
         }
         # print(args)
@@ -38,6 +55,47 @@ class Problem:
 
         # Instantiate Generator
         self.generator = Generator.get_generator(self.generator)()
+        if hasattr(self, 'checker'):
+            self.generator.checker = Checker.from_spec(self.checker)
+        if hasattr(self, 'validator'):
+            self.generator.validator = Validator(self.validator)
+        self.corpus = Corpus(self.generator)
+
+        self.cache = ReferenceCache(
+            self.code, self.generator.fingerprint(), self.reference_submission.submission_id
+        )
+
+    def expected(self, seed: int, stdin) -> collections.defaultdict:
+        response = collections.defaultdict()
+        output = self.cache.get(seed)
+        if output is not None:
+            response['status'] = 'success'
+            response['stdout'] = output
+            response['stderr'] = ''
+            return response
+
+        response = self.executor.run(stdin)
+        if response['status'] == 'success':
+            self.cache.put(seed, response['stdout'])
+        return response
+
+    def fill(self, seeds: int):
+        try:
+            for seed in range(1, seeds + 1):
+                if seed not in self.cache:
+                    self.expected(seed, self.corpus.generate(seed))
+                # Inputs that are not stored would be generated again by every worker anyway
+                if self.corpus.full:
+                    logging.info(f"The corpus of problem {self.code} is full, stopped warming at seed {seed}")
+                    break
+        except:
+            logging.error(traceback.format_exc())
+
+    def warm(self, seeds: int):
+        # A separate process rather than a thread: generators seed the global
+        # random module, which must not be shared with the stress loop
+        logging.info(f"Warming reference outputs of problem {self.code} for {seeds} seeds ...")
+        multiprocessing.Process(target=self.fill, args=(seeds,), daemon=True).start()
 
 
 class Submission:
@@ -54,7 +112,7 @@ class Submission:
         # self.verdict = args["verdict"]
             
     def set_limits(self, time_limit: int, memory_limit: int):
-        self.time_limit = int(time_limit) * self.language['MULTIPLIER']
+        self.time_limit = float(time_limit) * self.language['MULTIPLIER']
         self.memory_limit = int(memory_limit)
             
     def prepare(self):
@@ -67,7 +125,7 @@ class Submission:
             "time_limit": self.time_limit,
             "memory_limit": int(self.memory_limit) * 1024,
             "source_file_name": f"{self.submission_id}{self.language['EXTENSION']}",
-            "path": f"/tmp/",
+            "path": workspace(self.submission_id),
             "executable": f"{self.submission_id}_exe"
         }
         # print(args)
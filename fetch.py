@@ -9,26 +9,145 @@ import requests
 
 import UTIL
 from config import Constants
+from judge.cache import atomic_write
+from store import SourceStore
 
 last_time = time.time()
 minimum_gap = 5
 
+# Every request goes here; benchmarks point it at a local stand-in
+base_url = Constants.setup["BASE_URL"]
+
+# One keep-alive connection pool for every request made to Codeforces
+session = requests.Session()
+store = SourceStore(os.path.join(Constants.cache["directory"], "sources.db"))
+
+
+class Record:
+    """
+    Compact form of a contest.status entry, keeping only what hacking needs
+    """
+
+    __slots__ = (
+        "id",
+        "contest_id",
+        "problem",
+        "handle",
+        "party",
+        "language",
+        "verdict",
+        "creation_time",
+        "time_consumed",
+        "memory_consumed",
+    )
 
-def fetch_all_hackable_submissions_using_api(contest_id: str) -> list:
-
-    response_file = f"{contest_id}_api_resp.json"
-    if os.path.exists(response_file):
-        return json.loads(open(response_file, "r").read())
-
-    url = f"https://codeforces.com/api/contest.status?contestId={contest_id}"
-
-    resp_from_api = requests.get(url)
-    response = json.loads(resp_from_api.text)
-
-    if response["status"] != "OK":
-        raise Exception(f"Failed to fetch submissions for Contest {contest_id}")
+    def __init__(self, *values):
+        for slot, value in zip(Record.__slots__, values):
+            setattr(self, slot, value)
+
+    @classmethod
+    def from_api(cls, submission: dict) -> "Record":
+        return cls(
+            submission["id"],
+            submission["contestId"],
+            submission["problem"]["index"],
+            submission["author"]["members"][0]["handle"],
+            submission["author"]["participantType"],
+            submission["programmingLanguage"],
+            submission.get("verdict"),
+            submission["creationTimeSeconds"],
+            submission.get("timeConsumedMillis"),
+            submission.get("memoryConsumedBytes"),
+        )
 
-    all_submissions = response["result"]
+    def to_row(self) -> list:
+        return [getattr(self, slot) for slot in Record.__slots__]
+
+
+def parse_contest_status(chunks) -> iter:
+    """
+    Incrementally decode the "result" array of a contest.status response.
+
+    chunks is any iterable of text fragments of the response body; entries
+    are yielded one at a time as soon as they are complete, so the whole
+    body is never held in memory. That needs "status" to come before
+    "result", as Codeforces sends it; when it comes after, the entries are
+    kept until "status" has been read.
+    """
+    decoder = json.JSONDecoder()
+    header = re.compile(r'"result"\s*:\s*\[')
+    status_field = re.compile(r'"status"\s*:\s*"(\w+)"')
+    buffer = ""
+    position = None
+    # None until "status" is read; entries wait in pending until then
+    status = None
+    pending = []
+    finished = False
+    chunks = iter(chunks)
+    exhausted = False
+
+    while True:
+        if finished:
+            # The whole array was read before "status"
+            match = status_field.search(buffer, position)
+            if match is not None:
+                if match.group(1) != "OK":
+                    raise Exception(f"contest.status failed: {buffer[position:position + 256]}")
+                yield from pending
+                return
+        elif position is None:
+            match = header.search(buffer)
+            if match is not None:
+                before = status_field.search(buffer[: match.start()])
+                if before is not None:
+                    status = before.group(1)
+                    if status != "OK":
+                        raise Exception(f"contest.status failed: {buffer[:256]}")
+                position = match.end()
+                continue
+        else:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+
+            if buffer.startswith("]", position):
+                if status is not None:
+                    return
+                finished = True
+                position += 1
+                continue
+
+            if position < len(buffer):
+                try:
+                    submission, position = decoder.raw_decode(buffer, position)
+                    if status is None:
+                        pending.append(submission)
+                    else:
+                        yield submission
+                    continue
+                except json.JSONDecodeError:
+                    if exhausted:
+                        raise
+
+            buffer = buffer[position:]
+            position = 0
+
+        if exhausted:
+            if position is None or finished:
+                raise Exception(f"contest.status failed: {buffer[:256]}")
+            raise Exception(f"Unexpected end of contest.status response: {buffer[:256]}")
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+        else:
+            buffer += chunk
+
+
+def hackable(all_submissions) -> list:
+    """
+    The submissions worth hacking, as Records sorted by the order of problems in metadata.json
+    """
+    # The filters below are lazy, so each entry is dropped or kept as soon as it is parsed
     hackable_submissions = filter(
         lambda submission: submission["author"]["participantType"]
         in Constants.setup["ALLOWED_PARTIES"],
@@ -56,44 +175,195 @@ def fetch_all_hackable_submissions_using_api(contest_id: str) -> list:
         hackable_submissions,
     )
 
-    hackable_submissions = list(hackable_submissions)
+    hackable_submissions = list(map(Record.from_api, hackable_submissions))
     hackable_submissions.sort(
-        key=lambda submission: allowed_problems.index(submission["problem"]["index"])
+        key=lambda submission: allowed_problems.index(submission.problem)
+    )
+    return hackable_submissions
+
+
+def fetch_all_hackable_submissions_using_api(contest_id: str) -> list:
+
+    response_file = f"{contest_id}_api_resp.jsonl"
+    if os.path.exists(response_file):
+        with open(response_file, "r") as file:
+            return [Record(*json.loads(line)) for line in file]
+
+    url = f"{base_url}/api/contest.status?contestId={contest_id}"
+
+    resp_from_api = session.get(url, stream=True)
+    resp_from_api.encoding = resp_from_api.encoding or "utf-8"
+    all_submissions = parse_contest_status(
+        resp_from_api.iter_content(chunk_size=1 << 16, decode_unicode=True)
     )
 
+    hackable_submissions = hackable(all_submissions)
+
     with open(response_file, "w") as file:
-        json.dump(hackable_submissions, file, indent=2)
+        for submission in hackable_submissions:
+            file.write(json.dumps(submission.to_row(), separators=(",", ":")) + "\n")
 
     return hackable_submissions
 
 
-def fetch_submission(submission: dict) -> dict:
+class StatusPoller:
+    """
+    Incremental reader of contest.status for a contest that is still running.
+
+    contest.status lists the newest submissions first. The first poll reads
+    the whole contest in one request; later ones page from the top (from/count)
+    down to the submissions an earlier poll already settled. Submissions still
+    being judged are looked at again by the next poll, so they are picked up as
+    soon as their verdict is known.
+    """
+
+    page_size = 500
+
+    def __init__(self, contest_id: str):
+        self.contest_id = contest_id
+        self.settled = set()
+        # Every submission with an id up to this one is settled, None before the first poll
+        self.horizon = None
+
+    def page(self, start: int = None) -> list:
+        """
+        The submissions from the start-th newest on, all of them when start is None
+        """
+        wait_turn()
+        url = f"{base_url}/api/contest.status?contestId={self.contest_id}"
+        if start is not None:
+            url += f"&from={start}&count={StatusPoller.page_size}"
+        with session.get(url, stream=True) as response:
+            response.encoding = response.encoding or "utf-8"
+            return list(parse_contest_status(response.iter_content(chunk_size=1 << 16, decode_unicode=True)))
+
+    def poll(self) -> list:
+        """
+        The hackable submissions that got their verdict since the last poll
+        """
+        new_submissions = []
+        testing = []
+        # Paging a whole contest costs a request per page, one unpaged request is far cheaper
+        start = None if self.horizon is None else 1
+        while True:
+            page = self.page(start)
+            for submission in page:
+                if submission["id"] in self.settled:
+                    continue
+                if submission.get("verdict", "TESTING") == "TESTING":
+                    testing.append(submission["id"])
+                    continue
+                self.settled.add(submission["id"])
+                new_submissions.append(submission)
+
+            # New submissions push older ones down while paging, which may repeat some but never skips any
+            if start is None or len(page) < StatusPoller.page_size or page[-1]["id"] <= self.horizon:
+                break
+            start += StatusPoller.page_size
+
+        self.horizon = min(testing) - 1 if testing else max(self.settled, default=self.horizon or 0)
+        logging.info(f"Polled contest {self.contest_id}: {len(new_submissions)} new verdicts, {len(testing)} submissions in testing")
+        return hackable(new_submissions)
+
+
+def fetch_ratings(handles) -> dict:
+    """
+    Current rating of every handle, None for unrated ones.
+
+    Ratings barely move during a round, so they are kept in
+    cache/ratings.json and only unknown handles are asked for.
+    """
+    path = os.path.join(Constants.cache["directory"], "ratings.json")
+    ratings = {}
+    if os.path.exists(path):
+        with open(path) as file:
+            ratings = json.load(file)
+
+    # Handles are case-insensitive and user.info may spell them differently
+    missing = sorted({handle.lower() for handle in handles} - set(ratings))
+    batches = [missing[start : start + 300] for start in range(0, len(missing), 300)]
+    while batches:
+        batch = batches.pop()
+        wait_turn()
+        response = session.get(f"{base_url}/api/user.info", params={"handles": ";".join(batch)}).json()
+        if response["status"] == "OK":
+            for user in response["result"]:
+                ratings[user["handle"].lower()] = user.get("rating")
+            continue
+
+        # A single renamed or deleted handle fails the whole batch: drop it when the
+        # comment names it, otherwise split the batch to find it. Failed handles are
+        # not cached, so they are asked for again on the next run.
+        logging.error(f"user.info failed: {response.get('comment')}")
+        named = [handle for handle in batch if re.search(rf"(?<![\w.-]){re.escape(handle)}(?![\w.-])", response.get("comment", "").lower())]
+        if named:
+            batches.append([handle for handle in batch if handle not in named])
+        elif len(batch) > 1:
+            batches += [batch[: len(batch) // 2], batch[len(batch) // 2 :]]
+        batches = [batch for batch in batches if batch]
+
+    if missing:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        atomic_write(path, json.dumps(ratings))
+
+    return {handle: ratings.get(handle.lower()) for handle in handles}
+
+
+def wait_turn():
+    # Keeps requests to Codeforces at least minimum_gap seconds apart
     global last_time, minimum_gap
+
     while time.time() - last_time < minimum_gap:
         logging.info("Sleeping for 1 second")
         time.sleep(1)
 
     last_time = time.time()
 
-    submission_id = submission["id"]
-    contest_id = submission["contestId"]
-    url = f"https://codeforces.com/contest/{contest_id}/submission/{submission_id}"
+
+def load_submission(submission_id) -> dict:
+    """
+    A submission from the local store, None if it was never fetched
+    """
+    stored = store.get(submission_id)
+    if stored is not None:
+        # Only the language's name is kept, so its settings are always the current ones.
+        # Entries stored before that hold the whole language, of which only the name is used.
+        language = stored["language"]
+        stored["language"] = UTIL.get_langauge(language["LANGUAGE"] if isinstance(language, dict) else language)
+    return stored
+
+
+def save_submission(submission: dict) -> None:
+    store.put({**submission, "language": submission["language"]["LANGUAGE"]})
+
+
+def fetch_submission(submission: Record) -> dict:
+    stored = load_submission(submission.id)
+    if stored is not None:
+        logging.info(f"Found submission {submission.id} in the local store")
+        return stored
+
+    wait_turn()
+
+    submission_id = submission.id
+    contest_id = submission.contest_id
+    url = f"{base_url}/contest/{contest_id}/submission/{submission_id}"
 
     logging.info(f"Currently Fetching {url} ...")
 
-    resp = requests.get(url)
+    resp = session.get(url)
     soup = bs4.BeautifulSoup(resp.text, "html.parser")
 
     # Fetch attributes one by one:
 
     # Problem Link
-    problem = submission["problem"]["index"]
+    problem = submission.problem
 
     # Owner
-    owner = submission["author"]["members"][0]["handle"]
+    owner = submission.handle
 
     # Language
-    language = UTIL.get_langauge(submission["programmingLanguage"])
+    language = UTIL.get_langauge(submission.language)
 
     # Source
     source = soup.find(id="program-source-text").get_text(strip=True)
@@ -101,9 +371,9 @@ def fetch_submission(submission: dict) -> dict:
         source = re.sub(r"\bpublic\s+class\b", "class", source)
 
     # Verdict
-    verdict = submission["verdict"]
+    verdict = submission.verdict
 
-    return {
+    obj = {
         "submission_id": submission_id,
         "problem": problem,
         "contest_id": contest_id,
@@ -113,15 +383,23 @@ def fetch_submission(submission: dict) -> dict:
         "verdict": verdict,
     }
 
+    save_submission(obj)
+    return obj
+
 
 def fetch_reference_submission(url: str) -> dict:
     tokens = url.split("/")
     contest_id = tokens[-3]
     submission_id = tokens[-1]
 
+    stored = load_submission(submission_id)
+    if stored is not None:
+        logging.info(f"Found submission {submission_id} in the local store")
+        return stored
+
     logging.info(f"Currently Fetching {url} ...")
 
-    resp = requests.get(url)
+    resp = session.get(url)
 
     if resp.status_code != 200:
         logging.error(f"Cannot fetch submission from {url}")
@@ -173,4 +451,5 @@ def fetch_reference_submission(url: str) -> dict:
         "verdict": verdict,
     }
 
+    save_submission(obj)
     return obj
@@ -1,27 +1,71 @@
+import functools
 import io
 import json
 import logging
+import multiprocessing
+import multiprocessing.pool
+import threading
+import time
 import traceback
 
-import fetch
+import cluster
 from entities import *
+from ledger import Ledger
 from judge import stress
+from pipeline import Pipeline
+from priority import Priority, SubmissionQueue
+from scheduler import Scheduler
 import UTIL
 
 
+def judge(
+    problem: Problem, submission: Submission, metadata: dict, timeout: float,
+    max_seeds: int = None, first_seed: int = 1, final: bool = True, progress=None
+) -> dict:
+    """
+    Compile and stress-test a single submission.
+
+    final=False is a triage run: there is no time search, and a submission
+    that survives stays prepared for the deep phase. progress is called with
+    every seed the submission passes.
+    Kept at module level so that it can be shipped to worker processes.
+    """
+    submission.prepare()
+    stressor = stress.Stressor(
+        problem, submission, timeout, metadata.get("shrink", 0), metadata.get("search", 0) if final else 0,
+        max_seeds, first_seed, purge=final, progress=progress
+    )
+    stressor.prepare()
+    return stressor.test()
+
+
 class Hacker:
     def __init__(self, metadata: dict, problems: list, hackable_submissions: list):
         self.metadata = metadata
         self.problems = problems
         self.hackable_submissions = hackable_submissions
         self.hack_log_file = f"{metadata['contest']}_hack.log"
-        self.checked_file = f"{metadata['contest']}_checked.log"
+        self.ledger = Ledger(f"{metadata['contest']}_ledger.db")
         self.problem_mapper = {problem.code: problem for problem in problems}
+        self.workers = max(1, int(metadata.get("workers", 1)))
+        self.prefetch = max(1, int(metadata.get("prefetch", 4)))
+        # Caps the submissions handed to the pool but not yet judged
+        self.in_flight = threading.BoundedSemaphore(self.workers + self.prefetch)
+        self.clusters = cluster.Clusters()
+        # Serializes record, which runs on the main thread (cluster copies, serial
+        # judging) as well as on the result handler thread of the pool. Re-entrant
+        # because recording a verdict records the members that waited for it.
+        self.record_lock = threading.RLock()
+        self.priority = Priority(metadata, problems) if metadata.get("priority", True) else None
+        # A budget counts from the first run, also in daemon mode
+        self.started = time.time()
 
     def publish_successful_hack(self, verdict: dict):
         with open(self.hack_log_file, "a") as file:
             for key, value in verdict.items():
-                if key not in ['stdin', 'expected_output', 'defender_output']:
+                if isinstance(value, bytes):
+                    value = value.decode(errors='replace')
+                if key not in ['minimal_stdin', 'stdin', 'expected_output', 'defender_output']:
                     file.write(f'{key}: {value}\n')
                 else:
                     file.write(f'{key}:\n{value}\n')
@@ -35,46 +79,191 @@ class Hacker:
                 
             file.write('*' * 128 + '\n')
 
-    def try_hack(self, problem: Problem, submission: Submission):
-        logging.info(f"Trying to hack submission {submission.submission_id} ...")
+    def record(self, submission_id: int, verdict: dict):
+        # The only place that writes to the log files and settles the ledger,
+        # one verdict at a time whichever thread it is called from
+        with self.record_lock:
+            if verdict['status'] == 'hacked':
+                self.publish_successful_hack(verdict)
+            else:
+                self.publish_failed_hack(verdict)
+
+            self.ledger.finish(submission_id, verdict)
 
-        timeout = self.metadata["timeout"]
-        stressor = stress.Stressor(problem, submission, timeout)
-        stressor.prepare()
-        verdict = stressor.test()
-        if verdict['status'] == 'hacked':
-            self.publish_successful_hack(verdict)
+            # Copies say nothing new about how often a problem gets hacked
+            if self.priority is not None and 'representative' not in verdict and verdict['status'] in ('hacked', 'failed hack attempt'):
+                self.priority.observe(verdict['problem'], verdict['status'] == 'hacked')
+
+            for member in self.clusters.resolve(submission_id, verdict):
+                self.record(member, cluster.Clusters.copy(verdict, member, submission_id))
+
+    def report_error(self, submission_id: int, error: BaseException):
+        logging.error(f"Exception when trying to hack {submission_id}")
+        logging.error(''.join(traceback.format_exception(error)))
+
+        for member in self.clusters.abandon(submission_id):
+            logging.error(f"Submission {member} is left unjudged along with submission {submission_id}")
+
+    def settle(self, problem: Problem, submission: Submission, final: bool, verdict: dict):
+        # Submissions that survive the triage are judged again in the deep phase
+        if final or verdict['status'] != 'failed hack attempt':
+            if not final:
+                self.scheduler.remove(problem.code)
+            self.record(submission.submission_id, verdict)
         else:
-            self.publish_failed_hack(verdict)
+            self.ledger.triaged(submission.submission_id, verdict.get('seeds', 0))
+            self.survivors.append((problem, submission))
+
+    # collect and collect_error run on the result handler thread of the pool, which dies
+    # with any exception they raise and then never releases a slot of in_flight again
 
-        with open(self.checked_file, 'a') as file:
-            file.write(f'{submission.submission_id}\n')
+    def collect(self, problem: Problem, submission: Submission, final: bool, verdict: dict):
+        try:
+            self.settle(problem, submission, final, verdict)
+        except:
+            logging.error(f"Could not settle submission {submission.submission_id}")
+            logging.error(traceback.format_exc())
+        finally:
+            self.in_flight.release()
 
-    def run(self):
-        checked_submissions = set()
+    def collect_error(self, submission_id: int, error: BaseException):
         try:
-            with open(self.checked_file, 'r') as file:
-                lines = file.readlines()
-                lines = [line.strip() for line in lines]
-                checked_submissions = set(lines)
+            self.report_error(submission_id, error)
         except:
             logging.error(traceback.format_exc())
+        finally:
+            self.in_flight.release()
+
+    def try_hack(self, problem: Problem, submission: Submission, *plan):
+        logging.info(f"Trying to hack submission {submission.submission_id} ...")
+
+        progress = functools.partial(self.ledger.progress, submission.submission_id)
+        verdict = judge(problem, submission, self.metadata, *plan, progress)
+        self.settle(problem, submission, plan[-1], verdict)
+
+    def dispatch(self, pool: multiprocessing.pool.Pool, problem: Problem, submission: Submission, *plan):
+        self.in_flight.acquire()
+        logging.info(f"Dispatching submission {submission.submission_id} to the worker pool ...")
+
+        return pool.apply_async(
+            judge,
+            (problem, submission, self.metadata, *plan, functools.partial(self.ledger.progress, submission.submission_id)),
+            callback=functools.partial(self.collect, problem, submission, plan[-1]),
+            error_callback=functools.partial(self.collect_error, submission.submission_id),
+        )
+
+    def hack(self, pool: multiprocessing.pool.Pool, problem: Problem, submission: Submission, *plan):
+        """
+        Judge a submission with the plan (timeout, max_seeds, first_seed, final),
+        returns the AsyncResult in parallel mode
+        """
+        if pool is None:
+            self.try_hack(problem, submission, *plan)
+            return None
+        return self.dispatch(pool, problem, submission, *plan)
+
+    def deepen(self, pool: multiprocessing.pool.Pool, problem: Problem, submission: Submission, first_seed: int):
+        timeout = self.scheduler.allocate(problem.code)
+        if timeout <= 0:
+            logging.info(f"The budget is spent, not hacking submission {submission.submission_id}")
+            submission.executor.purge()
+            return
+        self.hack(pool, problem, submission, timeout, self.scheduler.max_seeds, first_seed, True)
 
-        for submission in self.hackable_submissions:
-            if submission['id'] in checked_submissions:
-                continue
+    def run(self, purge: bool = True):
+        """
+        Judge every hackable submission not settled yet. purge=False keeps the
+        reference submissions prepared for another run (daemon mode).
+        """
+        checked_submissions = self.ledger.settled()
+        logging.info(f"{len(checked_submissions)} submissions are already settled")
+
+        pending_submissions = [
+            submission for submission in self.hackable_submissions if submission.id not in checked_submissions
+        ]
+        self.scheduler = Scheduler(self.metadata, self.problems, pending_submissions, self.workers, self.started)
+
+        pool = None
+        if self.workers > 1:
+            logging.info(f"Stress testing with {self.workers} worker processes")
+            pool = multiprocessing.Pool(self.workers)
+
+        # With triage_seeds, every submission is first run on that many seeds only,
+        # and the survivors are stress-tested with the time left once all are triaged
+        triage_seeds = int(self.metadata.get("triage_seeds", 0))
+        self.survivors = []
+        triaged = []
+
+        # The most promising submissions are fetched first, re-ranked as verdicts come in
+        submissions = pending_submissions
+        if self.priority is not None:
+            self.priority.extend(pending_submissions)
+            submissions = SubmissionQueue(self.priority, pending_submissions)
+
+        pipeline = Pipeline(submissions, self.problem_mapper, checked_submissions, self.prefetch, self.scheduler.remove)
+        for problem, submission in pipeline:
             try:
-                submission = Submission(fetch.fetch_submission(submission))
-                try:
-                    problem = self.problem_mapper[submission.problem]
-                except:
+                if self.scheduler.spent():
+                    logging.info(f"The budget is spent, stopping before submission {submission.submission_id}")
+                    submission.executor.purge()
+                    break
+
+                # Resume right after the last seed passed before a restart
+                resume = self.ledger.last_seed(submission.submission_id)
+                self.ledger.start(submission.submission_id, problem.code)
+
+                # Copies of an earlier submission get its verdict instead of a stress test of their own
+                representative, verdict = self.clusters.join(
+                    cluster.keys(problem, submission), submission.submission_id
+                )
+                if representative is not None:
+                    self.scheduler.remove(problem.code)
+                    submission.executor.purge()
+                    if verdict is not None:
+                        self.record(submission.submission_id, cluster.Clusters.copy(verdict, submission.submission_id, representative))
                     continue
-                submission.set_limits(problem.time_limit, problem.memory_limit)
-                submission.prepare()
-                self.try_hack(problem, submission)
+
+                if triage_seeds > resume:
+                    triaged.append(self.hack(pool, problem, submission, self.scheduler.timeout, triage_seeds, resume + 1, False))
+                else:
+                    self.deepen(pool, problem, submission, resume + 1)
+            except:
+                logging.error(f"Exception when trying to hack {submission.submission_id}")
+                logging.error(traceback.format_exc())
+                self.clusters.abandon(submission.submission_id)
+
+        # Nothing more is taken from the pipeline once the budget is spent
+        pipeline.stop()
+
+        for result in triaged:
+            if result is not None:
+                result.wait()
+
+        if triage_seeds > 0:
+            hacked = len(triaged) - len(self.survivors)
+            logging.info(f"Triage is over: {hacked} of {len(triaged)} submissions settled, {len(self.survivors)} left to stress-test")
+
+        if self.priority is not None:
+            records = {record.id: record for record in pending_submissions}
+            self.survivors.sort(key=lambda survivor: -self.priority.score(records[survivor[1].submission_id]))
+
+        for problem, submission in self.survivors:
+            try:
+                self.deepen(pool, problem, submission, triage_seeds + 1)
             except:
                 logging.error(f"Exception when trying to hack {submission.submission_id}")
                 logging.error(traceback.format_exc())
+                self.clusters.abandon(submission.submission_id)
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+        # Serial runs record their progress in this process
+        self.ledger.checkpoint()
+
+        if purge:
+            for problem in self.problems:
+                problem.executor.purge()
 
-        for problem in self.problems:
-            problem.executor.purge()
\ No newline at end of file
+        for code, counts in self.ledger.summary().items():
+            logging.info(f"Problem {code}: {counts}")
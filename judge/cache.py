@@ -0,0 +1,193 @@
+#!/usr/bin/python3
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import traceback
+
+from config import Constants
+
+
+def atomic_write(path: str, contents) -> None:
+    """
+    Write contents (str or bytes) to path such that concurrent readers
+    (other workers, the background warmer) never observe a partially written file.
+    """
+    directory = os.path.dirname(path)
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        if isinstance(contents, bytes):
+            file = os.fdopen(descriptor, 'wb')
+        else:
+            file = os.fdopen(descriptor, 'w', newline='')
+        with file:
+            file.write(contents)
+        os.replace(temporary, path)
+    except:
+        os.remove(temporary)
+        raise
+
+
+def digest(contents: bytes) -> str:
+    return hashlib.sha1(contents).hexdigest()
+
+
+class ReferenceCache:
+    """
+    Outputs of a reference submission keyed by (problem code, generator, seed).
+
+    Every output is persisted to disk so it survives restarts and is shared
+    between worker processes. The most recently used outputs are also kept in
+    memory; outputs larger than the spill threshold are only remembered by
+    their digest and re-read from their spill file on demand.
+    """
+
+    def __init__(self, problem_code: str, generator: str, reference_id):
+        settings = Constants.cache['reference']
+        self.capacity = settings['capacity']
+        self.spill_threshold = settings['spill_threshold']
+        self.directory = os.path.join(
+            Constants.cache['directory'], 'reference', str(reference_id), f'{problem_code}_{generator}'
+        )
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __path(self, seed: int) -> str:
+        return os.path.join(self.directory, f'{seed}.out')
+
+    def __remember(self, seed: int, output: bytes) -> None:
+        if len(output) > self.spill_threshold:
+            self.entries[seed] = (digest(output), None)
+        else:
+            self.entries[seed] = (None, output)
+
+        self.entries.move_to_end(seed)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, seed: int) -> bool:
+        return seed in self.entries or os.path.exists(self.__path(seed))
+
+    def get(self, seed: int):
+        spilled_digest, output = self.entries.get(seed, (None, None))
+        if output is not None:
+            self.entries.move_to_end(seed)
+            self.hits += 1
+            return output
+
+        try:
+            with open(self.__path(seed), 'rb') as file:
+                output = file.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        if spilled_digest is not None and spilled_digest != digest(output):
+            logging.error(f"Spill file {self.__path(seed)} is corrupted, discarding it")
+            self.entries.pop(seed, None)
+            self.misses += 1
+            return None
+
+        self.__remember(seed, output)
+        self.hits += 1
+        return output
+
+    def put(self, seed: int, output: bytes) -> None:
+        try:
+            atomic_write(self.__path(seed), output)
+        except:
+            logging.error(traceback.format_exc())
+        self.__remember(seed, output)
+
+
+class BuildCache:
+    """
+    Content-addressed store of build artifacts (executables, class files).
+
+    Entries are keyed by a hash of the source, the compiler command and the
+    language mapping, so resubmissions, shared templates and restarts all
+    reuse an earlier build. Least recently used entries are evicted once the
+    store grows beyond max_bytes.
+    """
+
+    def __init__(self):
+        self.max_bytes = Constants.cache['build']['max_bytes']
+        self.directory = os.path.join(Constants.cache['directory'], 'build')
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(mapping: str, shell_cmds: list, source: str) -> str:
+        hasher = hashlib.sha256()
+        hasher.update(mapping.encode())
+
+        # The compiler binary itself is part of the key, so upgrading it invalidates the cache
+        compiler = shutil.which(shell_cmds[0])
+        if compiler is not None:
+            hasher.update(f'{compiler}:{os.stat(compiler).st_mtime_ns}'.encode())
+
+        for cmd in shell_cmds:
+            hasher.update(b'\0' + cmd.encode())
+        hasher.update(b'\0' + source.encode())
+        return hasher.hexdigest()
+
+    def lookup(self, key: str):
+        """
+        Returns the entry directory and its metadata, or (None, None) on a miss
+        """
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, 'metadata.json'), 'r') as file:
+                metadata = json.load(file)
+            os.utime(entry)  # Mark as recently used
+            return entry, metadata
+        except (FileNotFoundError, NotADirectoryError):
+            return None, None
+        except:
+            logging.error(traceback.format_exc())
+            return None, None
+
+    def store(self, key: str, artifacts: dict, metadata: dict = None) -> None:
+        """
+        artifacts maps the name to store each file under to its current path
+        """
+        entry = os.path.join(self.directory, key)
+        if os.path.isdir(entry):
+            return
+
+        staging = tempfile.mkdtemp(dir=self.directory, suffix='.tmp')
+        try:
+            for name, path in artifacts.items():
+                shutil.copy2(path, os.path.join(staging, name))
+            with open(os.path.join(staging, 'metadata.json'), 'w') as file:
+                json.dump(metadata or {}, file)
+            os.rename(staging, entry)
+        except OSError:
+            # Another worker stored the same build first
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir() or entry.name.endswith('.tmp'):
+                continue
+            size = sum(item.stat().st_size for item in os.scandir(entry.path))
+            entries.append((entry.stat().st_mtime, size, entry.path))
+            total += size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
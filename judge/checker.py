@@ -0,0 +1,84 @@
+import itertools
+import math
+import re
+
+
+class Checker:
+    """
+    Compares two outputs token by token, stopping at the first difference.
+
+    Tokens are maximal runs of non-whitespace, produced lazily from the raw
+    bytes, so neither output is ever split into lists. Modes:
+        - exact: tokens must be identical
+        - case: tokens must be identical ignoring case
+        - integer: tokens must be equal as integers (e.g. 007 and 7)
+        - float: tokens must be equal as reals within an absolute or relative tolerance
+    """
+
+    modes = ('exact', 'case', 'integer', 'float')
+    __token = re.compile(rb'\S+')
+
+    def __init__(self, mode: str = 'exact', tolerance: float = 1e-6):
+        if mode not in Checker.modes:
+            raise ValueError(f"Unknown checker mode {mode}, expected one of {Checker.modes}")
+        self.mode = mode
+        self.tolerance = tolerance
+
+    @classmethod
+    def from_spec(cls, spec) -> 'Checker':
+        """
+        spec is a mode name or a dict such as {"mode": "float", "tolerance": 1e-9}
+        """
+        if isinstance(spec, Checker):
+            return spec
+        if isinstance(spec, str):
+            return cls(spec)
+        return cls(**spec)
+
+    def same(self, expected: bytes, found: bytes) -> bool:
+        if expected == found:
+            return True
+
+        if self.mode == 'case':
+            return expected.lower() == found.lower()
+
+        try:
+            if self.mode == 'integer':
+                return int(expected) == int(found)
+
+            if self.mode == 'float':
+                expected, found = float(expected), float(found)
+                if math.isnan(expected) or math.isnan(found):
+                    return False
+                return abs(expected - found) <= self.tolerance * max(1.0, abs(expected))
+        except ValueError:
+            pass
+
+        return False
+
+    def compare(self, expected_output, defender_output) -> tuple:
+        """
+        Returns (True, None) if the outputs match, otherwise (False, difference)
+        where difference locates the first mismatching token
+        """
+        if isinstance(expected_output, str):
+            expected_output = expected_output.encode()
+        if isinstance(defender_output, str):
+            defender_output = defender_output.encode()
+
+        expected_tokens = Checker.__token.finditer(expected_output)
+        defender_tokens = Checker.__token.finditer(defender_output)
+
+        for index, (expected, found) in enumerate(itertools.zip_longest(expected_tokens, defender_tokens)):
+            if expected is not None and found is not None and self.same(expected.group(), found.group()):
+                continue
+
+            position = found.start() if found is not None else len(defender_output)
+            return False, {
+                'token': index + 1,
+                'line': defender_output.count(b'\n', 0, position) + 1,
+                'expected': expected.group().decode(errors='replace') if expected is not None else None,
+                'found': found.group().decode(errors='replace') if found is not None else None,
+            }
+
+        return True, None
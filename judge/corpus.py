@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+
+import fcntl
+import logging
+import mmap
+import os
+import traceback
+
+from config import Constants
+from judge.cache import atomic_write
+from judge.generator import Generator
+from judge.launcher import Input
+
+
+class Corpus:
+    """
+    Inputs produced by a generator, stored once per seed.
+
+    The first request for a seed runs the generator and writes its output to
+    disk; every later request (other submissions, other workers, restarts)
+    replays the file through mmap instead of generating it again. New inputs
+    stop being stored once the corpus reaches max_bytes. Every copy of a
+    corpus (pool tasks, the warmer) shares one count of its size, kept in a
+    file next to the inputs and updated under a lock.
+    """
+
+    def __init__(self, generator: Generator):
+        self.generator = generator
+        self.max_bytes = Constants.cache['corpus']['max_bytes']
+        self.directory = os.path.join(Constants.cache['directory'], 'corpus', generator.fingerprint())
+        os.makedirs(self.directory, exist_ok=True)
+        self.counter = os.path.join(self.directory, 'size')
+        # Set once a store did not fit
+        self.full = False
+
+    def __path(self, seed: int) -> str:
+        return os.path.join(self.directory, f'{seed}.in')
+
+    def replay(self, seed: int):
+        """
+        The stored input of seed as a read-only mmap, None if it was not stored.
+        Nothing is read until a page is touched: runs get the file itself as
+        stdin (see input), so usually only a hack or a custom validator does.
+        """
+        try:
+            with open(self.__path(seed), 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return b''
+                return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def __scan(self) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith('.in'))
+
+    def store(self, seed: int, stdin: bytes) -> bool:
+        """
+        Store the input of seed unless the corpus is full, False once it is
+        """
+        path = self.__path(seed)
+        try:
+            with open(self.counter, 'a+') as counter:
+                fcntl.flock(counter, fcntl.LOCK_EX)
+                counter.seek(0)
+                size = counter.read()
+                size = int(size) if size else self.__scan()
+                if size + len(stdin) > self.max_bytes:
+                    self.full = True
+                    return False
+                # Another worker may have generated the same seed meanwhile
+                if not os.path.exists(path):
+                    atomic_write(path, stdin)
+                    counter.truncate(0)
+                    counter.write(str(size + len(stdin)))
+        except:
+            logging.error(traceback.format_exc())
+        return True
+
+    def input(self, seed: int, stdin: bytes) -> Input:
+        """
+        The stdin to hand to executables for seed: its corpus file when it
+        was stored, otherwise an in-memory copy of stdin
+        """
+        try:
+            return Input(path=self.__path(seed))
+        except FileNotFoundError:
+            return Input(stdin)
+
+    def generate(self, seed: int):
+        """
+        The input of seed: bytes when it was just generated, a bytes-like mmap when replayed
+        """
+        stdin = self.replay(seed)
+        if stdin is None:
+            stdin = self.generator.generate(seed)
+            self.store(seed, stdin)
+        else:
+            # Validators may look at the input they were generated for
+            self.generator.stdin = stdin
+        return stdin
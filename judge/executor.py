@@ -4,11 +4,15 @@ import collections
 import logging
 import os
 import pathlib
+import shutil
+import signal
 import subprocess
 import traceback
 
 import config
 import judge.job as job
+import judge.launcher as launcher
+from judge.cache import BuildCache, digest
 
 
 class Executor:
@@ -67,37 +71,103 @@ class Executor:
         return response
 
     @staticmethod
-    def exec(task: job.Job, shell_cmds: list, stdin: str) -> collections.defaultdict:
-        response = collections.defaultdict()
-        try:
-            time_limit = str(task.time_limit)
-            memory_limit = str(task.memory_limit)
-            timeout_perl = os.path.join(os.path.dirname(__file__), 'timeout.pl')
+    def build(task: job.Job, shell_cmds: list) -> collections.defaultdict:
+        """
+        Compile task.source into task.executable through the build cache
+        """
+        cache = BuildCache()
+        # The output path differs for every submission, so it is not part of the key
+        key = BuildCache.key(task.lang, [cmd for cmd in shell_cmds if cmd != task.executable], task.source)
+
+        entry, _ = cache.lookup(key)
+        if entry is not None:
+            response = collections.defaultdict()
+            try:
+                shutil.copy2(os.path.join(entry, 'executable'), task.executable)
+                response['status'] = 'success'
+                response['cached'] = key
+                return response
+            except:
+                logging.error(traceback.format_exc())
 
-            # shell_cmds = ['perl', timeout_perl, '-t', time_limit, '-m', memory_limit] + shell_cmds
+        response = Executor.prep(task, shell_cmds)
+        if response['status'] == 'success':
+            cache.store(key, {'executable': task.executable})
+        return response
 
-            # print("Commands:", shell_cmds)
-            # print("Path:",task.path)
-            # print(stdin)
-            
-            process = subprocess.run(shell_cmds, capture_output=True, check=True, cwd=task.path, input=stdin, text=True, timeout=int(time_limit))
-            
-            response['status'] = 'success'
-            response['stdout'] = process.stdout
-            response['stderr'] = process.stderr
+    @staticmethod
+    def digest_files(*paths) -> str:
+        """
+        Digest of what a job runs, equal for jobs that behave the same
+        """
+        contents = b''
+        for path in paths:
+            with open(path, 'rb') as file:
+                contents += digest(file.read()).encode()
+        return digest(contents)
+
+    # Messages runtimes print when an allocation fails
+    out_of_memory_markers = ('MemoryError', 'std::bad_alloc', 'OutOfMemoryError')
 
-        except subprocess.TimeoutExpired as e:
-            response['status'] = 'error'
-            response['message'] = traceback.format_exc()
-            response['stdout'] = e.stdout
-            response['stderr'] = e.stderr
+    @staticmethod
+    def exec(task: job.Job, shell_cmds: list, stdin, limit_memory: bool = True) -> collections.defaultdict:
+        """
+        Run a command under the task's limits and report a verdict.
+
+        stdin is a str, bytes or a launcher.Input; stdout is returned as bytes.
+        status is one of 'success', 'TLE', 'MLE', 'RE' (the command ran) or
+        'error' (it could not be run). cpu_time and wall_time are in seconds,
+        memory is the peak resident set size in KB. limit_memory=False leaves
+        memory enforcement to the runtime itself (e.g. -Xmx for the JVM): the
+        resident set then includes the runtime's own overhead beyond the limit,
+        so MLE is only judged from the runtime running out of memory.
+        """
+        response = collections.defaultdict()
+        try:
+            time_limit = float(task.time_limit)
+            memory_limit = int(task.memory_limit)  # KB
+
+            # CPU time decides TLE; the wall clock limit only stops sleeping or starved children.
+            # The address space backstop is generous so that MLE can still be told from a crash.
+            if isinstance(stdin, str):
+                stdin = stdin.encode()
+
+            process = launcher.launch(
+                shell_cmds,
+                stdin,
+                time_limit * config.Constants.rse['wall_time_factor'] + 1,
+                memory_limit=2 * memory_limit * 1024 if limit_memory else None,
+                cpu_limit=time_limit,
+            )
+            stderr = process.stderr.decode(errors='replace')
+
+            if process.timed_out:
+                response['status'] = 'TLE'
+                response['message'] = f"Command '{shell_cmds}' was killed after {process.wall_time:.2f}s of wall time"
+            elif process.cpu_time is None:
+                # The launcher did not report the usage, so no verdict can be trusted
+                response['status'] = 'error'
+                response['message'] = f"No resource usage reported for '{shell_cmds}', exit status {process.returncode}"
+            elif process.cpu_time > time_limit or process.returncode == -signal.SIGXCPU:
+                response['status'] = 'TLE'
+                response['message'] = f"Command '{shell_cmds}' used {process.cpu_time:.2f}s of CPU time, limit is {time_limit}s"
+            elif limit_memory and process.memory > memory_limit:
+                response['status'] = 'MLE'
+                response['message'] = f"Command '{shell_cmds}' used {process.memory} KB, limit is {memory_limit} KB"
+            elif any(marker in stderr for marker in Executor.out_of_memory_markers):
+                response['status'] = 'MLE'
+                response['message'] = f"Command '{shell_cmds}' ran out of memory"
+            elif process.returncode != 0:
+                response['status'] = 'RE'
+                response['message'] = f"Command '{shell_cmds}' returned non-zero exit status {process.returncode}."
+            else:
+                response['status'] = 'success'
 
-        except subprocess.CalledProcessError as e:
-            response['status'] = 'error'
-            response['message'] = traceback.format_exc()
-            response['stdout'] = e.stdout
-            response['stderr'] = e.stderr
-            # print(e.stdout, e.stderr)
+            response['stdout'] = process.stdout
+            response['stderr'] = stderr
+            response['cpu_time'] = process.cpu_time
+            response['wall_time'] = process.wall_time
+            response['memory'] = process.memory
 
         except Exception as e:
             response['status'] = 'error'
@@ -121,11 +191,14 @@ class Executor:
             Executor.set_attributes(self, args)
             self.executable = os.path.join(self.path, self.executable)
             shell_cmds = ['gcc', '-DONLINE_JUDGE', '-xc', '-', '-o', self.executable, '-lm']
-            return Executor.prep(self, shell_cmds)
+            return Executor.build(self, shell_cmds)
 
-        def run(self, stdin: str) -> collections.defaultdict:
-            shell_cmds = [self.executable]
+        def run(self, stdin, args: list = ()) -> collections.defaultdict:
+            shell_cmds = [self.executable, *args]
             return Executor.exec(self, shell_cmds, stdin)
+
+        def digest(self) -> str:
+            return Executor.digest_files(self.executable)
             
         @classmethod
         def get_status(cls) -> list:
@@ -149,12 +222,15 @@ class Executor:
             Executor.set_attributes(self, args)
             self.executable = os.path.join(self.path, self.executable)
             shell_cmds = ['g++', '-DONLINE_JUDGE', '-std=c++17', '-Wshadow', '-Wall', '-o', self.executable, '-O2', '-Wno-unused-result', '-xc++', '-']
-            return Executor.prep(self, shell_cmds)
+            return Executor.build(self, shell_cmds)
 
-        def run(self, stdin: str) -> collections.defaultdict:
-            shell_cmds = [self.executable]
+        def run(self, stdin, args: list = ()) -> collections.defaultdict:
+            shell_cmds = [self.executable, *args]
             return Executor.exec(self, shell_cmds, stdin)
 
+        def digest(self) -> str:
+            return Executor.digest_files(self.executable)
+
         @classmethod
         def get_status(cls) -> list:
             # TODO: Implement the method
@@ -187,6 +263,25 @@ class Executor:
             main_method_classes = [class_file.stem for class_file, byte_code in zip(class_files, byte_codes) if has_main_method(byte_code)]
             return main_method_classes
 
+        def __create_archive(self) -> str:
+            """
+            Dump an AppCDS archive of the classes loaded by a trial run, so that
+            every later run maps them from the archive instead of loading and
+            verifying them again. Returns None if the JVM does not support it.
+            """
+            archive = os.path.join(self.path, f'{self.main_class}.jsa')
+            shell_cmds = ['java', f'-XX:ArchiveClassesAtExit={archive}', *self.jvm_options, '-cp', self.path, self.main_class]
+            try:
+                subprocess.run(shell_cmds, capture_output=True, cwd=self.path, input='', text=True, timeout=float(self.time_limit) + 5)
+            except subprocess.TimeoutExpired:
+                pass
+
+            if os.path.exists(archive):
+                return archive
+
+            logging.info(f"Could not create a class data archive for {self.source_file_name}")
+            return None
+
         def prepare(self, args: collections.defaultdict) -> collections.defaultdict:
             response = collections.defaultdict()
             try:
@@ -199,6 +294,22 @@ class Executor:
                     return response
 
                 self.target_directory = pathlib.Path(self.path)
+                self.jvm_options = config.Constants.rse['jvm_options']
+                self.archive = None
+
+                cache = BuildCache()
+                key = BuildCache.key(self.lang, ['javac'], self.source)
+                entry, metadata = cache.lookup(key)
+                if entry is not None:
+                    self.class_files = []
+                    for class_file in metadata['class_files']:
+                        self.class_files.append(shutil.copy2(os.path.join(entry, class_file), self.path))
+                    self.main_class = metadata['main_class']
+                    self.archive = self.__create_archive()
+                    response['status'] = 'success'
+                    response['cached'] = key
+                    response['Main Class'] = str(self.main_class)
+                    return response
 
                 shell_cmds = ['javac', output]
                 process = subprocess.run(shell_cmds, capture_output=True, check=True, cwd=self.path, text=True)
@@ -214,6 +325,12 @@ class Executor:
                     if len(main_method_classes) == 1:
                         self.main_class = main_method_classes[0]
                         response['Main Class'] = str(self.main_class)
+                        cache.store(
+                            key,
+                            {class_file.name: class_file for class_file in self.class_files},
+                            {'class_files': [class_file.name for class_file in self.class_files], 'main_class': self.main_class}
+                        )
+                        self.archive = self.__create_archive()
                     else:
                         response.clear()
                         if len(main_method_classes) == 0:
@@ -237,9 +354,17 @@ class Executor:
 
             return response
 
-        def run(self, stdin: str) -> dict:
-            shell_cmds = ['java', '-cp', self.path, self.main_class]
-            return Executor.exec(self, shell_cmds, stdin)
+        def run(self, stdin, args: list = ()) -> dict:
+            shell_cmds = ['java', *self.jvm_options, f'-Xmx{self.memory_limit}k']
+            if self.archive is not None:
+                shell_cmds.append(f'-XX:SharedArchiveFile={self.archive}')
+            shell_cmds += ['-cp', self.path, self.main_class, *args]
+            return Executor.exec(self, shell_cmds, stdin, limit_memory=False)
+
+        def digest(self) -> str:
+            # Class files record their source file name, which is the submission id,
+            # so Java submissions in practice only cluster by source
+            return Executor.digest_files(*sorted(self.class_files, key=lambda class_file: pathlib.Path(class_file).name))
 
         @classmethod
         def get_status(cls) -> list:
@@ -251,7 +376,9 @@ class Executor:
             try:
                 for class_file in self.class_files:
                     os.remove(class_file)
-                os.remove(self.source_file_name)
+                if self.archive is not None:
+                    os.remove(self.archive)
+                os.remove(os.path.join(self.path, self.source_file_name))
             except:
                 logging.error(traceback.format_exc())
 
@@ -262,24 +389,48 @@ class Executor:
         def signature(cls) -> str:
             return "PYTHON"
 
+        # Compiles the source read from stdin into a .pyc file runnable by the same interpreter
+        compiler = (
+            "import importlib.util, marshal, sys; "
+            "code = compile(sys.stdin.read(), sys.argv[2], 'exec'); "
+            "open(sys.argv[1], 'wb').write(importlib.util.MAGIC_NUMBER + bytes(12) + marshal.dumps(code))"
+        )
+
         def prepare(self, args: collections.defaultdict) -> collections.defaultdict:
             response = collections.defaultdict()
             try:
                 Executor.set_attributes(self, args)
-                response['status'] = 'success'
+
+                # Run PyPy submissions under PyPy, when it is installed
+                self.interpreter = self.language.get('INTERPRETER', 'python3')
+                if shutil.which(self.interpreter) is None:
+                    logging.warning(f"{self.interpreter} is not installed, falling back to python3")
+                    self.interpreter = 'python3'
+
+                self.executable = os.path.join(self.path, f'{self.executable}.pyc')
+                shell_cmds = [self.interpreter, '-c', Executor.PYTHON.compiler, self.executable, 'main.py']
+                return Executor.build(self, shell_cmds)
             except Exception as e:
                 response['status'] = 'error'
                 response['message'] = traceback.format_exc()
             return response
 
-        def run(self, stdin: str) -> dict:
-            shell_cmds = ['python3', '-c', self.source]
+        def run(self, stdin, args: list = ()) -> dict:
+            # -E: no environment lookups, -B: no bytecode writes. site must still load, it defines exit() and quit()
+            shell_cmds = [self.interpreter, '-E', '-B', self.executable, *args]
             return Executor.exec(self, shell_cmds, stdin)
 
+        def digest(self) -> str:
+            # The same bytecode may still behave differently under CPython and PyPy
+            return digest(f'{self.interpreter}:{Executor.digest_files(self.executable)}'.encode())
+
         @classmethod
         def get_status(cls) -> list:
             # TODO: Implement the method
             return super().get_status()
 
         def purge(self) -> bool:
-            pass
\ No newline at end of file
+            try:
+                os.remove(self.executable)
+            except:
+                logging.error(traceback.format_exc())
\ No newline at end of file
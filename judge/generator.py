@@ -1,22 +1,54 @@
+import functools
+import hashlib
+import inspect
 import io
+import logging
+import os
 import random
+import tempfile
 from abc import ABC, abstractmethod
 
+from config import Constants
+from judge.checker import Checker
+from judge.remo import Remo
+from judge.spec import Array, Line, Permutation, Range, Spec, String
+
 
 class Generator(ABC):
     @classmethod
     def get_generator(cls, generator: str):
+        # A source file in any supported language is run as a NativeGenerator
+        if os.path.isfile(generator):
+            return functools.partial(NativeGenerator, generator)
+
         for subclass_name, subclass in globals().items():
             if isinstance(subclass, type) and issubclass(subclass, cls) and subclass.__name__ == generator:
                 return subclass
 
         raise ValueError(f"No Generator found with the name {generator}!")
 
+    @classmethod
+    def fingerprint(cls) -> str:
+        # Changes whenever the generator's code changes, so that anything
+        # cached against its output is invalidated along with it
+        source = inspect.getsource(cls)
+        return f"{cls.__name__}_{hashlib.sha1(source.encode()).hexdigest()[:12]}"
+
+    # How outputs are compared, see judge.checker.Checker.
+    # Overridden per problem by "checker" in metadata.json.
+    comparison = 'exact'
+
     def __init__(self):
         self.buffer = io.StringIO()
         self.stdin = None
-        self.stdout = None
-        self.stdexpout = None
+        self.checker = Checker.from_spec(self.comparison)
+        self.difference = None
+        # A Validator for whole inputs, set from "validator" in metadata.json
+        self.validator = None
+
+    def __getstate__(self) -> dict:
+        # The input of the last seed may be an mmap, and is of no use to another process
+        return {**self.__dict__, 'stdin': None}
 
     def print(self, *args, **kwargs):
         print(*args, **kwargs, file=self.buffer)
@@ -25,209 +57,197 @@ class Generator(ABC):
         self.buffer.seek(0)
         self.buffer.truncate(0)
 
-    def __process(self, contents: str) -> list:
-        contents = contents.strip().splitlines()
-        contents = list(map(lambda x: x.strip(), contents))
-        return contents[::-1]
-
-    def sanitize(self):
-        self.stdin = self.__process(self.stdin)
-        self.stdout = self.__process(self.stdout)
-        self.stdexpout = self.__process(self.stdexpout)
+    def getvalue(self) -> bytes:
+        # Encoded once here, inputs are bytes from then on
+        return self.buffer.getvalue().encode()
 
-    @abstractmethod
-    def generate(self, seed: int) -> str:
-        pass
-
-
-class AlphaGenerator(Generator):
-    def generate(self, seed: int) -> str:
-        random.seed(seed)
+    def validate(self, expected_output: bytes, defender_output: bytes) -> bool:
         """
-        Your Generator goes here
+        Whether the defender's output is accepted. The first difference, if
+        any, is kept in self.difference. Override for problems that need a
+        custom judge; the input is available as self.stdin (bytes, or an
+        mmap of the corpus file when it was replayed).
         """
-        # ################################################################
-
-        T = random.randint(10**4, 10**4)
-        self.print(T)
-
-        for test in range(T):
-            a = random.randint(0, 10**9)
-            b = random.randint(0, 10**9)
-            c = random.randint(0, 10**9)
-            self.print(a, b, c)
+        accepted, self.difference = self.checker.compare(expected_output, defender_output)
+        return accepted
 
-
-        # ################################################################
+    def check(self, case: list) -> bool:
         """
-        Generator ends
+        Whether a test case (its lines, as split returns them) meets the
+        problem's constraints. Candidates the Shrinker makes out of changed
+        test cases are only run if it does. Override for generators whose
+        test cases have rules of their own; SpecGenerator checks its spec.
         """
-        self.stdin = self.buffer.getvalue()
-        self.clear()
-        return self.stdin
-
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
-
-        return stdout == stdexpout
-    
-        # Comment above and Write your custom judge here
-        # Example:
-
-        # T = int(read(stdin)) # Number of test cases
-
+        return True
 
-class BetaGenerator(Generator):
-    def generate(self, seed: int) -> str:
-        random.seed(seed)
+    def valid(self, stdin: bytes) -> bool:
         """
-        Your Generator goes here
+        Whether an input rebuilt from test cases (by the Shrinker or the time
+        search) is one the problem accepts, according to the validator if any
         """
-        # ################################################################
+        return self.validator is None or self.validator.accepts(stdin)
 
-        T = random.randint(10**4, 10**4)
-        self.print(T)
-
-        for t in range(T):
-            a, b, m = [random.randint(1, 10**18) for i in range(3)]
-            self.print(a, b, m)
-
-        # ################################################################
+    def split(self, stdin: bytes) -> list:
         """
-        Generator ends
-        """
-        self.stdin = self.buffer.getvalue()
-        self.clear()
-        return self.stdin
+        Split an input into its test cases, each a list of lines (bytes).
 
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
+        Assumes the first line holds the number of test cases T, followed by
+        T cases spanning the same number of lines. Override this (and join)
+        for generators that produce a different layout.
+        """
+        lines = stdin.strip().splitlines()
+        T = int(lines[0])
+        if T <= 0 or (len(lines) - 1) % T != 0:
+            raise ValueError(f"Cannot split {len(lines) - 1} lines into {T} test cases")
 
-        return stdout == stdexpout
+        size = (len(lines) - 1) // T
+        return [lines[1 + i * size: 1 + (i + 1) * size] for i in range(T)]
 
-        # Comment above and Write your custom judge here
-        # Example:
+    def join(self, cases: list) -> bytes:
+        lines = [str(len(cases)).encode()] + [line for case in cases for line in case]
+        return b'\n'.join(lines) + b'\n'
 
-        # T = int(read(stdin)) # Number of test cases
+    @abstractmethod
+    def generate(self, seed: int) -> bytes:
+        pass
 
 
-class GammaGenerator(Generator):
-    def generate(self, seed: int) -> str:
-        random.seed(seed)
-        """
-        Your Generator goes here
-        """
-        # ################################################################
+class SpecGenerator(Generator):
+    """
+    A generator described by a judge.spec.Spec instead of code
+    """
+    spec = None
 
-        T = random.randint(100, 100)
-        self.print(T)
+    @classmethod
+    def fingerprint(cls) -> str:
+        # The same seed yields a different input with and without NumPy
+        return f"{super().fingerprint()}_{Spec.backend}"
 
-        for t in range(T):
-            N = random.randint(3, 10**3)
-            self.print(N)
-            bits = ''.join(
-                [
-                    str(random.randint(0, 1)) for i in range(N)
-                ]
-            )
-            self.print(bits)
+    def check(self, case: list) -> bool:
+        return self.spec.check(case)
 
-        # ################################################################
-        """
-        Generator ends
-        """
-        self.stdin = self.buffer.getvalue()
-        self.clear()
+    def generate(self, seed: int) -> bytes:
+        self.stdin = self.spec.generate(seed)
         return self.stdin
 
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
 
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
-
-        return stdout == stdexpout
-
-        # Comment above and Write your custom judge here
-        # Example:
+def compile_program(source_file: str, name: str, time_limit: float) -> Remo:
+    """
+    Compile a program in any language with an Executor, once per name, to run
+    with time_limit seconds of CPU time
+    """
+    with open(source_file) as file:
+        source = file.read()
+
+    extension = os.path.splitext(source_file)[1]
+    languages = [language for language in Constants.setup['ALLOWED_LANGUAGES'] if language['EXTENSION'] == extension]
+    if not languages:
+        raise ValueError(f"No language with the extension {extension} for {source_file}!")
+
+    path = os.path.join(tempfile.gettempdir(), name)
+    os.makedirs(path, exist_ok=True)
+    return Remo({
+        "lang": languages[0],
+        "source": source,
+        "source_file_name": os.path.basename(source_file),
+        "path": path,
+        "executable": f"{name}_exe",
+        "time_limit": time_limit
+    })
+
+
+def program_name(source_file: str) -> str:
+    # A program is cached by what it is, not by the file it lives in
+    with open(source_file) as file:
+        source = file.read()
+    stem = os.path.splitext(os.path.basename(source_file))[0]
+    return f"{stem}_{hashlib.sha1(source.encode()).hexdigest()[:12]}"
+
+
+class NativeGenerator(Generator):
+    """
+    A generator program in any language with an Executor, e.g. generators/zeta.cpp.
+    It is compiled once and run with the seed as its only argument; whatever it
+    prints is the input.
+    """
+
+    def __init__(self, source_file: str):
+        super().__init__()
+        self.source_file = source_file
+        # Generators are trusted and may be heavy, the limits of a submission are too tight for them
+        self.executor = compile_program(source_file, self.fingerprint(), Constants.rse['tool_time_limit'])
+
+    def fingerprint(self) -> str:
+        return program_name(self.source_file)
+
+    def generate(self, seed: int) -> bytes:
+        response = self.executor.run('', [str(seed)])
+        if response['status'] != 'success':
+            raise RuntimeError(f"Generator {self.source_file} failed on seed {seed}: {response['message']}")
+
+        self.stdin = response['stdout']
+        return self.stdin
 
-        # T = int(read(stdin)) # Number of test cases
 
+class Validator:
+    """
+    A program that reads an input and exits with status 0 if and only if it
+    meets the problem's constraints, e.g. validators/zeta.cpp. Any language
+    with an Executor will do; it is compiled once.
+    """
 
-class DeltaGenerator(Generator):
-    def generate(self, seed: int) -> str:
-        random.seed(seed)
-        """
-        Your Generator goes here
-        """
-        # ################################################################
+    def __init__(self, source_file: str):
+        self.source_file = source_file
+        self.executor = compile_program(source_file, f"{program_name(source_file)}_validator", Constants.rse['tool_time_limit'])
 
-        T = random.randint(100, 1000)
-        self.print(T)
+    def accepts(self, stdin: bytes) -> bool:
+        response = self.executor.run(stdin)
+        if response['status'] == 'error':
+            logging.error(f"Validator {self.source_file} could not be run: {response['message']}")
+        return response['status'] == 'success'
 
-        for test in range(T):
-            n = random.randint(1, 2 * 10**4)
-            m = random.randint(1, n)
-            self.print(n, m)
-            a = [random.randint(1, 10**9) for i in range(n)]
-            b = [random.randint(1, 10**9) for i in range(n)]
-            self.print(*a)
-            self.print(*b)
 
-        # ################################################################
-        """
-        Generator ends
-        """
-        self.stdin = self.buffer.getvalue()
-        self.clear()
-        return self.stdin
+class AlphaGenerator(SpecGenerator):
+    spec = Spec(
+        tests=10**4,
+        case=[
+            Line(a=Range(0, 10**9), b=Range(0, 10**9), c=Range(0, 10**9)),
+        ],
+    )
 
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
 
-        def read(file: list) -> str:
-            return file.pop()
+class BetaGenerator(SpecGenerator):
+    spec = Spec(
+        tests=10**4,
+        case=[
+            Line(a=Range(1, 10**18), b=Range(1, 10**18), m=Range(1, 10**18)),
+        ],
+    )
 
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
 
-        return stdout == stdexpout
+class GammaGenerator(SpecGenerator):
+    spec = Spec(
+        tests=100,
+        case=[
+            Line(N=Range(3, 10**3)),
+            String('N', '01'),
+        ],
+    )
 
-        # Comment above and Write your custom judge here
-        # Example:
 
-        # T = int(read(stdin)) # Number of test cases
+class DeltaGenerator(SpecGenerator):
+    spec = Spec(
+        tests=Range(100, 1000),
+        case=[
+            Line(n=Range(1, 2 * 10**4), m=Range(1, 'n')),
+            Array('n', 1, 10**9),
+            Array('n', 1, 10**9),
+        ],
+    )
 
 
 class EpsilonGenerator(Generator):
-    def generate(self, seed: int) -> str:
+    def generate(self, seed: int) -> bytes:
         random.seed(seed)
         """
         Your Generator goes here
@@ -245,84 +265,26 @@ class EpsilonGenerator(Generator):
         """
         Generator ends
         """
-        self.stdin = self.buffer.getvalue()
+        self.stdin = self.getvalue()
         self.clear()
         return self.stdin
 
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
 
-        return stdout == stdexpout
+class ZetaGenerator(SpecGenerator):
+    comparison = 'integer'
 
-        # Comment above and Write your custom judge here
-        # Example:
-
-        # T = int(read(stdin)) # Number of test cases
-
-
-class ZetaGenerator(Generator):
-    def generate(self, seed: int) -> str:
-        random.seed(seed)
-        """
-        Your Generator goes here
-        """
-        # ################################################################
-
-        T = random.randint(100, 1000)
-        self.print(T)
-
-        for t in range(T):
-            N = random.randint(1, 5 * 10**4)
-            self.print(N)
-            arr = [random.randint(1, 10**9) for i in range(N)]
-            self.print(arr)
-            perm = [i for i in range(1, N + 1)]
-            random.shuffle(perm)
-            self.print(*perm)
-
-        # ################################################################
-        """
-        Generator ends
-        """
-        self.stdin = self.buffer.getvalue()
-        self.clear()
-        return self.stdin
-
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
-
-        for a, b in zip(stdout, stdexpout):
-            if list(map(int, a.split())) != list(map(int, b.split())):
-                return False
-
-        return True
-
-        # Comment above and Write your custom judge here
-        # Example:
-
-        # T = int(read(stdin)) # Number of test cases
+    spec = Spec(
+        tests=Range(100, 1000),
+        case=[
+            Line(N=Range(1, 5 * 10**4)),
+            Array('N', 1, 10**9),
+            Permutation('N'),
+        ],
+    )
 
 
 class EtaGenerator(Generator):
-    def generate(self, seed: int) -> str:
+    def generate(self, seed: int) -> bytes:
         random.seed(seed)
         """
         Your Generator goes here
@@ -340,32 +302,13 @@ class EtaGenerator(Generator):
         """
         Generator ends
         """
-        self.stdin = self.buffer.getvalue()
+        self.stdin = self.getvalue()
         self.clear()
         return self.stdin
 
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
-
-        return stdout == stdexpout
-
-        # Comment above and Write your custom judge here
-        # Example:
-
-        # T = int(read(stdin)) # Number of test cases
-
 
 class ThetaGenerator(Generator):
-    def generate(self, seed: int) -> str:
+    def generate(self, seed: int) -> bytes:
         random.seed(seed)
         """
         Your Generator goes here
@@ -383,32 +326,13 @@ class ThetaGenerator(Generator):
         """
         Generator ends
         """
-        self.stdin = self.buffer.getvalue()
+        self.stdin = self.getvalue()
         self.clear()
         return self.stdin
 
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
-
-        return stdout == stdexpout
-
-        # Comment above and Write your custom judge here
-        # Example:
-
-        # T = int(read(stdin)) # Number of test cases
-
 
 class LambdaGenerator(Generator):
-    def generate(self, seed: int) -> str:
+    def generate(self, seed: int) -> bytes:
         random.seed(seed)
         """
         Your Generator goes here
@@ -426,32 +350,13 @@ class LambdaGenerator(Generator):
         """
         Generator ends
         """
-        self.stdin = self.buffer.getvalue()
+        self.stdin = self.getvalue()
         self.clear()
         return self.stdin
 
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
-
-        return stdout == stdexpout
-
-        # Comment above and Write your custom judge here
-        # Example:
-
-        # T = int(read(stdin)) # Number of test cases
-
 
 class SigmaGenerator(Generator):
-    def generate(self, seed: int) -> str:
+    def generate(self, seed: int) -> bytes:
         random.seed(seed)
         """
         Your Generator goes here
@@ -469,25 +374,6 @@ class SigmaGenerator(Generator):
         """
         Generator ends
         """
-        self.stdin = self.buffer.getvalue()
+        self.stdin = self.getvalue()
         self.clear()
         return self.stdin
-
-    def validate(self, expected_output: str, defender_output: str):
-        self.stdexpout = expected_output
-        self.stdout = defender_output
-        self.sanitize()
-
-        def read(file: list) -> str:
-            return file.pop()
-
-        stdin = self.stdin
-        stdout = self.stdout
-        stdexpout = self.stdexpout
-
-        return stdout == stdexpout
-
-        # Comment above and Write your custom judge here
-        # Example:
-
-        # T = int(read(stdin)) # Number of test cases
@@ -0,0 +1,237 @@
+#!/usr/bin/python3
+
+import collections
+import hashlib
+import math
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+
+from config import Constants
+
+Completed = collections.namedtuple(
+    'Completed', ['returncode', 'stdout', 'stderr', 'timed_out', 'cpu_time', 'wall_time', 'memory']
+)
+
+# Runs a command under resource limits and reports its exit status and usage on
+# the descriptor given as its third argument.
+#
+# ru_maxrss of a process started from this (large) Python process includes the
+# parent's own peak, because exec records the high-water mark of the address
+# space it replaces. Forking the command from this small helper keeps the
+# reported peak memory that of the command itself.
+HELPER = r'''
+#include <errno.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+
+int main(int argc, char **argv) {
+    long cpu_limit = atol(argv[1]), memory_limit = atol(argv[2]);
+    int report = atoi(argv[3]);
+    pid_t pid = fork();
+    if (pid < 0) return 126;
+    if (pid == 0) {
+        struct rlimit limit;
+        if (cpu_limit > 0) { limit.rlim_cur = cpu_limit; limit.rlim_max = cpu_limit + 1; setrlimit(RLIMIT_CPU, &limit); }
+        if (memory_limit > 0) { limit.rlim_cur = limit.rlim_max = memory_limit; setrlimit(RLIMIT_DATA, &limit); }
+        /* As on Codeforces the stack is only bounded by memory, deep recursion must not crash */
+        if (getrlimit(RLIMIT_STACK, &limit) == 0) { limit.rlim_cur = limit.rlim_max; setrlimit(RLIMIT_STACK, &limit); }
+        close(report);
+        execvp(argv[4], argv + 4);
+        _exit(127);
+    }
+    int status;
+    struct rusage usage;
+    while (wait4(pid, &status, 0, &usage) < 0)
+        if (errno != EINTR) return 126;
+    dprintf(report, "%d %ld.%06ld %ld.%06ld %ld\n", status,
+            (long)usage.ru_utime.tv_sec, (long)usage.ru_utime.tv_usec,
+            (long)usage.ru_stime.tv_sec, (long)usage.ru_stime.tv_usec, usage.ru_maxrss);
+    return 0;
+}
+'''
+
+__helper = None
+__helper_lock = threading.Lock()
+
+
+class Input:
+    """
+    Input shared by every run of a seed.
+
+    The bytes are written once to a memfd (or an existing file, e.g. a corpus
+    entry, is opened) and the descriptor becomes the stdin of each child, so
+    nothing is encoded, copied or pumped through a pipe per run.
+    """
+
+    def __init__(self, data: bytes = None, path: str = None):
+        if path is not None:
+            self.fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+            return
+
+        self.fd = os.memfd_create('stdin', os.MFD_CLOEXEC)
+        view = memoryview(data)
+        while len(view) > 0:
+            view = view[os.write(self.fd, view):]
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def helper() -> str:
+    """
+    Path of the compiled helper, building it on first use
+    """
+    global __helper
+    with __helper_lock:
+        if __helper is None:
+            directory = os.path.abspath(os.path.join(Constants.cache['directory'], 'bin'))
+            os.makedirs(directory, exist_ok=True)
+            # A binary built from another version of HELPER is never picked up
+            path = os.path.join(directory, f'launcher_{hashlib.sha1(HELPER.encode()).hexdigest()[:12]}')
+            if not os.path.exists(path):
+                staging = f'{path}.{os.getpid()}.tmp'
+                subprocess.run(['gcc', '-O2', '-xc', '-', '-o', staging], input=HELPER, text=True, check=True)
+                os.replace(staging, path)
+            __helper = path
+    return __helper
+
+
+def launch(shell_cmds: list, stdin, timeout: float, memory_limit: int = None, cpu_limit: float = None) -> Completed:
+    """
+    Run shell_cmds feeding it stdin (bytes or an Input), and collect its output.
+
+    A lean replacement for subprocess.run: the command is started through a
+    tiny C helper that measures it, a shared Input is handed over as a
+    descriptor instead of being pumped through a pipe, pipes are serviced
+    with a single selector loop, and nothing is decoded. The command
+    inherits the current working directory, so it must use absolute paths.
+
+    The command runs in a session of its own, which is killed as a whole
+    once it finishes or exceeds timeout (wall clock seconds).
+    memory_limit (bytes, caps the data segment) and cpu_limit (seconds) are
+    enforced with setrlimit. CPU time (seconds) and peak resident memory
+    (KB) come from wait4; both are None when the command was killed on timeout.
+    """
+    shared = isinstance(stdin, Input)
+    if shared:
+        # Every child gets a duplicate of the same descriptor, hence the same offset
+        os.lseek(stdin.fd, 0, os.SEEK_SET)
+    report_read, report_write = os.pipe()
+
+    limits = [str(math.ceil(cpu_limit) if cpu_limit else 0), str(memory_limit or 0), str(report_write)]
+    try:
+        # Starting it is left to subprocess, which already uses vfork; restore_signals
+        # gives the child back the SIGPIPE and SIGXFSZ dispositions Python ignores
+        process = subprocess.Popen(
+            [helper(), *limits, *shell_cmds],
+            stdin=stdin.fd if shared else subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            pass_fds=(report_write,),
+            start_new_session=True,
+        )
+        start_time = time.monotonic()
+    finally:
+        os.close(report_write)
+
+    pid = process.pid
+    stdin_write = None if shared else process.stdin.fileno()
+    stdout_read, stderr_read = process.stdout.fileno(), process.stderr.fileno()
+
+    outputs = {stdout_read: [], stderr_read: [], report_read: []}
+    deadline = start_time + timeout
+    timed_out = False
+
+    with selectors.DefaultSelector() as selector:
+        view = memoryview(b'' if shared else stdin)
+        if len(view) > 0:
+            os.set_blocking(stdin_write, False)
+            selector.register(stdin_write, selectors.EVENT_WRITE)
+        elif not shared:
+            process.stdin.close()
+        for fd in outputs:
+            selector.register(fd, selectors.EVENT_READ)
+
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+
+            for key, _ in selector.select(remaining):
+                fd = key.fd
+                if fd == stdin_write:
+                    try:
+                        written = os.write(fd, view[:1 << 16])
+                        view = view[written:]
+                    except BrokenPipeError:
+                        view = view[:0]
+                    if len(view) == 0:
+                        selector.unregister(fd)
+                        process.stdin.close()
+                else:
+                    chunk = os.read(fd, 1 << 16)
+                    if chunk:
+                        outputs[fd].append(chunk)
+                    else:
+                        selector.unregister(fd)
+
+        for key in list(selector.get_map().values()):
+            selector.unregister(key.fd)
+
+    for file in (process.stdin, process.stdout, process.stderr):
+        if file is not None:
+            file.close()
+    os.close(report_read)
+
+    if timed_out:
+        kill(pid)
+
+    status = process.wait()
+    wall_time = time.monotonic() - start_time
+    # Reap anything the command left behind in its group
+    kill(pid)
+
+    report = b''.join(outputs[report_read]).split()
+    if len(report) == 4:
+        returncode = os.waitstatus_to_exitcode(int(report[0]))
+        cpu_time = float(report[1]) + float(report[2])
+        memory = int(report[3])
+    else:
+        returncode = status
+        cpu_time = memory = None
+
+    return Completed(
+        returncode,
+        b''.join(outputs[stdout_read]),
+        b''.join(outputs[stderr_read]),
+        timed_out,
+        cpu_time,
+        wall_time,
+        memory,
+    )
+
+
+def kill(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
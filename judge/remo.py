@@ -28,6 +28,7 @@ class Remo:
     def __init__(self, args: collections.defaultdict):
         Remo.__load()
 
+        args['language'] = args['lang']
         args['lang'] = args['lang']['MAPPING']
         self.lang = args['lang']
         self.args = args
@@ -42,11 +43,11 @@ class Remo:
         except Exception as e:
             raise
 
-    def run(self, stdin: str) -> collections.defaultdict:
+    def run(self, stdin, args: list = ()) -> collections.defaultdict:
         response = collections.defaultdict()
         try:
 
-            run_response = self.executor.run(stdin)
+            run_response = self.executor.run(stdin, args)
             return run_response
         
         except Exception as e:
@@ -55,5 +56,8 @@ class Remo:
             
         return response
     
+    def digest(self) -> str:
+        return self.executor.digest()
+
     def purge(self):
         self.executor.purge()
\ No newline at end of file
@@ -0,0 +1,140 @@
+import logging
+import random
+import time
+import traceback
+
+
+class TimeSearch:
+    """
+    Evolutionary search for inputs on which the defender runs out of time.
+
+    Individuals are inputs assembled from test cases of the problem's
+    generated inputs (see Generator.split and Generator.join). Children are
+    bred by crossover of two parents and by swapping in test cases from
+    freshly generated inputs, keeping the number of test cases of a parent
+    and never outgrowing the largest generated input, so that constraints on
+    totals keep holding. Fitness is the defender's CPU time relative to its
+    own time limit, i.e. how close the input pushes it towards a TLE. The
+    initial population is made of whole generated inputs, whose expected
+    outputs the stress test already left in the reference cache.
+    """
+
+    def __init__(self, problem, submission, timeout: int, population: int = 8):
+        self.problem = problem
+        self.submission = submission
+        self.generator = problem.generator
+        self.timeout = timeout
+        self.population_size = population
+        self.random = random.Random(submission.submission_id)
+
+    def __expired(self) -> bool:
+        return time.time() - self.start_time > self.timeout
+
+    def __donor(self) -> list:
+        self.seed += 1
+        stdin = bytes(self.problem.corpus.generate(self.seed))
+        self.max_size = max(self.max_size, len(stdin))
+        return self.generator.split(stdin)
+
+    def evaluate(self, cases: list, seed: int = None):
+        """
+        Returns (fitness, hack verdict or None), or None if the reference rejects the input.
+        seed is given when cases are the whole input of that seed.
+        """
+        stdin = self.generator.join(cases)
+        if seed is not None:
+            expected_outcome = self.problem.expected(seed, stdin)
+        # Test cases come from generated inputs, but a mix of them may still break constraints on the whole
+        elif not self.generator.valid(stdin):
+            return None
+        else:
+            expected_outcome = self.problem.executor.run(stdin)
+        if expected_outcome['status'] != 'success':
+            return None
+
+        defender_outcome = self.submission.executor.run(stdin)
+        if defender_outcome['status'] == 'error':
+            return None
+
+        verdict = defender_outcome['status']
+        self.generator.stdin = stdin
+        if verdict == 'success' and not self.generator.validate(expected_outcome['stdout'], defender_outcome['stdout']):
+            verdict = 'WA'
+
+        if verdict != 'success':
+            return float('inf'), {
+                "verdict": verdict,
+                "cpu_time": defender_outcome["cpu_time"],
+                "memory": defender_outcome["memory"],
+                "stdin": stdin,
+                "expected_output": expected_outcome["stdout"],
+                "defender_output": defender_outcome["stdout"],
+            }
+
+        return defender_outcome['cpu_time'] / float(self.submission.time_limit), None
+
+    def breed(self, population: list) -> list:
+        # Tournament selection of two parents
+        first, second = (
+            max(self.random.sample(population, min(2, len(population))), key=lambda individual: individual[0])
+            for _ in range(2)
+        )
+        parent, other = first[1], second[1]
+
+        if self.random.random() < 0.5:
+            child = [self.random.choice((case, other[i % len(other)])) for i, case in enumerate(parent)]
+        else:
+            child = list(parent)
+
+        donor = self.__donor()
+        for _ in range(self.random.randint(1, max(1, len(child) // 4))):
+            child[self.random.randrange(len(child))] = self.random.choice(donor)
+
+        if len(self.generator.join(child)) > self.max_size:
+            return parent
+        return child
+
+    def search(self):
+        self.start_time = time.time()
+        self.seed = 0
+        self.max_size = 0
+        population = []
+
+        try:
+            self.__donor()
+        except ValueError:
+            logging.info(f"Input of {self.generator.__class__.__name__} is not a multi-test input, not searching it")
+            return None
+
+        try:
+            while len(population) < self.population_size and not self.__expired():
+                cases = self.__donor()
+                result = self.evaluate(cases, self.seed)
+                if result is None:
+                    continue
+                fitness, hack = result
+                if hack is not None:
+                    return hack
+                population.append((fitness, cases))
+
+            while population and not self.__expired():
+                child = self.breed(population)
+                result = self.evaluate(child)
+                if result is None:
+                    continue
+                fitness, hack = result
+                if hack is not None:
+                    return hack
+
+                worst = min(range(len(population)), key=lambda i: population[i][0])
+                if fitness > population[worst][0]:
+                    population[worst] = (fitness, child)
+
+        except:
+            logging.error(traceback.format_exc())
+            return None
+
+        if population:
+            fitness = max(individual[0] for individual in population)
+            logging.info(f"Slowest input found for {self.submission.submission_id} used {fitness:.0%} of its time limit")
+        return None
@@ -0,0 +1,133 @@
+import logging
+import re
+import time
+import traceback
+
+
+class Shrinker:
+    """
+    Reduces a failing input to a small one that still tells the reference and
+    the defender apart.
+
+    The input is split into test cases with Generator.split; delta debugging
+    over the test cases finds the ones that fail, after which every integer
+    in the remaining cases is lowered as far as the failure persists. A
+    candidate is only tried if every test case still meets the constraints
+    (Generator.check) and the validator, if the problem has one, accepts it:
+    otherwise a failure on it would not be a valid hack.
+    """
+
+    __integer = re.compile(rb'\d+')
+
+    def __init__(self, problem, submission, timeout: int):
+        self.problem = problem
+        self.submission = submission
+        self.generator = problem.generator
+        self.timeout = timeout
+        # Test cases are mostly tried again and again, so they are checked once
+        self.checked = {}
+
+    def __expired(self) -> bool:
+        return time.time() - self.start_time > self.timeout
+
+    def check(self, case: list) -> bool:
+        key = tuple(case)
+        if key not in self.checked:
+            self.checked[key] = self.generator.check(case)
+        return self.checked[key]
+
+    def fails(self, cases: list) -> bool:
+        if not all(self.check(case) for case in cases):
+            return False
+
+        stdin = self.generator.join(cases)
+        if not self.generator.valid(stdin):
+            return False
+
+        expected_outcome = self.problem.executor.run(stdin)
+        if expected_outcome['status'] != 'success':
+            # The reference must accept a candidate, otherwise it is probably invalid
+            return False
+
+        defender_outcome = self.submission.executor.run(stdin)
+        if defender_outcome['status'] in ('TLE', 'MLE', 'RE'):
+            return True
+        if defender_outcome['status'] != 'success':
+            return False
+
+        self.generator.stdin = stdin
+        return not self.generator.validate(expected_outcome['stdout'], defender_outcome['stdout'])
+
+    def bisect(self, cases: list) -> list:
+        granularity = 2
+        while len(cases) > 1 and not self.__expired():
+            size = -(-len(cases) // granularity)
+            chunks = [cases[i:i + size] for i in range(0, len(cases), size)]
+
+            for i, chunk in enumerate(chunks):
+                if self.fails(chunk):
+                    cases, granularity = chunk, 2
+                    break
+
+                complement = [case for j, other in enumerate(chunks) if j != i for case in other]
+                if len(chunks) > 2 and self.fails(complement):
+                    cases, granularity = complement, max(granularity - 1, 2)
+                    break
+            else:
+                if granularity >= len(cases):
+                    break
+                granularity = min(2 * granularity, len(cases))
+
+        return cases
+
+    def reduce(self, cases: list) -> list:
+        cases = [list(case) for case in cases]
+        for case in cases:
+            # Integers equal to the length of another line are most likely sizes, leave them be
+            lengths = {str(len(line.split())).encode() for line in case}
+
+            for index, line in enumerate(case):
+                for match in reversed(list(Shrinker.__integer.finditer(line))):
+                    if self.__expired():
+                        return cases
+
+                    start, end = match.span()
+                    is_signed_or_real = line[start - 1:start] in (b'-', b'.') or line[end:end + 1] == b'.'
+                    if is_signed_or_real or match.group() in lengths:
+                        continue
+
+                    # Binary search for the smallest value that still fails,
+                    # assuming failures are monotonic in this value
+                    low, high = 1, int(match.group())
+                    while low < high and not self.__expired():
+                        middle = (low + high) // 2
+                        case[index] = line[:start] + str(middle).encode() + line[end:]
+                        if self.fails(cases):
+                            high = middle
+                        else:
+                            low = middle + 1
+
+                    line = case[index] = line[:start] + str(high).encode() + line[end:]
+
+        return cases
+
+    def shrink(self, stdin: bytes):
+        self.start_time = time.time()
+        try:
+            cases = self.generator.split(stdin)
+        except:
+            logging.info(f"Input of {self.generator.__class__.__name__} is not a multi-test input, not shrinking it")
+            return None
+
+        # The generated test cases meet the constraints as they are
+        self.checked = {tuple(case): True for case in cases}
+
+        try:
+            cases = self.bisect(cases)
+            cases = self.reduce(cases)
+        except:
+            logging.error(traceback.format_exc())
+
+        minimal = self.generator.join(cases)
+        logging.info(f"Shrunk failing input from {len(stdin)} to {len(minimal)} bytes in {time.time() - self.start_time:.2f}s")
+        return minimal
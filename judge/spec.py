@@ -0,0 +1,306 @@
+"""
+Declarative input specifications.
+
+A Spec describes a multi-test input as the number of test cases and the lines
+of one test case, e.g.
+
+    Spec(
+        tests=Range(100, 1000),
+        case=[
+            Line(n=Range(1, 2 * 10**4), m=Range(1, 'n')),
+            Array('n', 1, 10**9),
+            Permutation('n'),
+        ],
+    )
+
+Bounds and lengths may name a variable defined earlier in the same test case.
+With NumPy installed a Spec is generated column by column: every variable,
+array, permutation and string is drawn for all test cases at once and
+formatted in bulk. Without NumPy it falls back to the random module, one test
+case at a time. Either way the input is reproducible per seed, but the two
+backends produce different inputs for the same seed. A Spec also checks test
+cases against itself, so that inputs rebuilt from generated test cases (see
+judge.shrink.Shrinker) are kept within the constraints.
+"""
+
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def resolve(value, variables: dict):
+    return variables[value] if isinstance(value, str) else value
+
+
+# The four digits of 0..9999 as the bytes of one uint32, in native byte order
+QUADS = numpy.frombuffer(''.join(f'{i:04d}' for i in range(10000)).encode(), dtype=numpy.uint32) if numpy else None
+
+
+def format_lines(values, lengths) -> tuple:
+    """
+    Format consecutive runs of integers, one run per line, as space separated
+    lines in a single uint8 buffer, without formatting any number on its own.
+
+    Every number gets a row of a byte matrix: its sign, its digits right-aligned,
+    four at a time from a table, and a separator. A mask of the bytes each row
+    really uses, looked up by sign and number of digits, then packs the rows.
+    Returns the buffer and the offsets of the lines in it: line i is
+    buffer[offsets[i]:offsets[i + 1]], its newline included.
+    """
+    values = numpy.asarray(values, dtype=numpy.int64)
+    lengths = numpy.asarray(lengths, dtype=numpy.int64)
+    negative = values < 0
+    magnitude = numpy.abs(values)
+    top = int(magnitude.max(initial=0))
+    length = len(str(top))
+    width = -(-length // 4) * 4
+
+    # A row is [3 unused, sign, digits..., separator, 3 unused], so that every
+    # four digits are one aligned uint32
+    matrix = numpy.empty((len(values), width + 8), dtype=numpy.uint8)
+    quads = matrix.view(numpy.uint32)
+    matrix[:, 3] = ord('-')
+    matrix[:, width + 4] = ord(' ')
+
+    # 32 bit arithmetic is much faster, so larger numbers are cut into 8 digit parts first
+    column = width // 4
+    rest = magnitude
+    while column > 0:
+        if top >= 2**32 and column > 2:
+            rest, part = numpy.divmod(rest, 10**8)
+            part, steps = part.astype(numpy.uint32), 2
+        else:
+            part, steps = rest.astype(numpy.uint32), column
+        for _ in range(steps):
+            quotient = part // numpy.uint32(10000)
+            quads[:, column] = QUADS[part - quotient * numpy.uint32(10000)]
+            part = quotient
+            column -= 1
+
+    digits = numpy.ones(len(values), dtype=numpy.int8)
+    for power in range(1, length):
+        numpy.add(digits, magnitude >= 10**power, out=digits, casting='unsafe')
+
+    # The bytes a row really uses depend only on its sign and number of digits:
+    # one table row per case, picked for every number in a single gather
+    used = numpy.zeros((2, width + 1, width + 8), dtype=bool)
+    used[1, :, 3] = True
+    used[:, :, 4:width + 4] = numpy.arange(width) >= width - numpy.arange(width + 1)[:, None]
+    used[:, :, width + 4] = True
+    rows = used.reshape(2 * (width + 1), width + 8).view(f'V{width + 8}').ravel()
+    keep = rows[negative * (width + 1) + digits].view(bool).reshape(matrix.shape)
+    buffer = matrix[keep]
+
+    # Where every number ends in the buffer, its separator included
+    ends = numpy.concatenate(([0], numpy.cumsum(digits + negative + 1, dtype=numpy.int64)))
+    last = numpy.cumsum(lengths)
+    first = last - lengths
+    buffer[ends[last[lengths > 0]] - 1] = ord('\n')
+    empty = lengths == 0
+    if empty.any():
+        # An empty line is still its newline
+        buffer = numpy.insert(buffer, ends[first[empty]], ord('\n'))
+
+    sizes = ends[last] - ends[first] + empty
+    return buffer, numpy.concatenate(([0], numpy.cumsum(sizes)))
+
+
+class Range:
+    """
+    An integer drawn uniformly from [low, high]
+    """
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def draw(self, rng: random.Random, variables: dict) -> int:
+        return rng.randint(resolve(self.low, variables), resolve(self.high, variables))
+
+    def contains(self, value: int, variables: dict) -> bool:
+        return resolve(self.low, variables) <= value <= resolve(self.high, variables)
+
+    def draw_all(self, rng, variables: dict, tests: int):
+        low = resolve(self.low, variables)
+        high = resolve(self.high, variables)
+        return rng.integers(low, numpy.add(high, 1), size=tests, dtype=numpy.int64)
+
+
+class Line:
+    """
+    A line of named integers, each a Range or a constant
+    """
+
+    def __init__(self, **variables):
+        self.variables = variables
+
+    def draw(self, rng: random.Random, variables: dict) -> str:
+        values = []
+        for name, value in self.variables.items():
+            variables[name] = value.draw(rng, variables) if isinstance(value, Range) else value
+            values.append(variables[name])
+        return ' '.join(map(str, values))
+
+    def check(self, line: bytes, variables: dict) -> bool:
+        tokens = line.split()
+        if len(tokens) != len(self.variables):
+            return False
+        for (name, value), token in zip(self.variables.items(), tokens):
+            variables[name] = int(token)
+            if not (value.contains(variables[name], variables) if isinstance(value, Range) else variables[name] == value):
+                return False
+        return True
+
+    def draw_all(self, rng, variables: dict, tests: int) -> tuple:
+        columns = []
+        for name, value in self.variables.items():
+            if isinstance(value, Range):
+                variables[name] = value.draw_all(rng, variables, tests)
+            else:
+                variables[name] = numpy.full(tests, value, dtype=numpy.int64)
+            columns.append(variables[name])
+        return format_lines(numpy.stack(columns, axis=1).ravel(), numpy.full(tests, len(columns)))
+
+
+class Array:
+    """
+    A line of length integers drawn uniformly from [low, high]
+    """
+
+    def __init__(self, length, low, high):
+        self.length = length
+        self.low = low
+        self.high = high
+
+    def draw(self, rng: random.Random, variables: dict) -> str:
+        low, high = resolve(self.low, variables), resolve(self.high, variables)
+        return ' '.join(str(rng.randint(low, high)) for _ in range(resolve(self.length, variables)))
+
+    def check(self, line: bytes, variables: dict) -> bool:
+        low, high = resolve(self.low, variables), resolve(self.high, variables)
+        values = [int(token) for token in line.split()]
+        return len(values) == resolve(self.length, variables) and all(low <= value <= high for value in values)
+
+    def draw_all(self, rng, variables: dict, tests: int) -> tuple:
+        lengths = numpy.broadcast_to(resolve(self.length, variables), tests)
+        low = resolve(self.low, variables)
+        high = resolve(self.high, variables)
+        if isinstance(low, numpy.ndarray):
+            low = numpy.repeat(low, lengths)
+        if isinstance(high, numpy.ndarray):
+            high = numpy.repeat(high, lengths)
+
+        values = rng.integers(low, numpy.add(high, 1), size=int(lengths.sum()), dtype=numpy.int64)
+        return format_lines(values, lengths)
+
+
+class Permutation:
+    """
+    A line holding a permutation of 1..length
+    """
+
+    def __init__(self, length):
+        self.length = length
+
+    def draw(self, rng: random.Random, variables: dict) -> str:
+        permutation = list(range(1, resolve(self.length, variables) + 1))
+        rng.shuffle(permutation)
+        return ' '.join(map(str, permutation))
+
+    def check(self, line: bytes, variables: dict) -> bool:
+        return sorted(int(token) for token in line.split()) == list(range(1, resolve(self.length, variables) + 1))
+
+    def draw_all(self, rng, variables: dict, tests: int) -> tuple:
+        lengths = numpy.broadcast_to(resolve(self.length, variables), tests)
+        starts = numpy.repeat(numpy.cumsum(lengths) - lengths, lengths)
+        cases = numpy.repeat(numpy.arange(tests), lengths)
+
+        # Sorting random keys in [case, case + 1) shuffles every test case at once
+        order = numpy.argsort(cases + rng.random(int(lengths.sum())))
+        return format_lines(order - starts + 1, lengths)
+
+
+class String:
+    """
+    A line of length characters drawn uniformly from alphabet
+    """
+
+    def __init__(self, length, alphabet: str):
+        self.length = length
+        self.alphabet = alphabet
+
+    def draw(self, rng: random.Random, variables: dict) -> str:
+        return ''.join(rng.choices(self.alphabet, k=resolve(self.length, variables)))
+
+    def check(self, line: bytes, variables: dict) -> bool:
+        line = line.strip()
+        return len(line) == resolve(self.length, variables) and set(line) <= set(self.alphabet.encode())
+
+    def draw_all(self, rng, variables: dict, tests: int) -> tuple:
+        lengths = numpy.broadcast_to(resolve(self.length, variables), tests).astype(numpy.int64)
+        alphabet = numpy.frombuffer(self.alphabet.encode(), dtype=numpy.uint8)
+        characters = alphabet[rng.integers(0, len(alphabet), size=int(lengths.sum()))]
+
+        offsets = numpy.concatenate(([0], numpy.cumsum(lengths + 1)))
+        buffer = numpy.full(int(offsets[-1]), ord('\n'), dtype=numpy.uint8)
+        # Every position but the newlines ending the lines
+        text = numpy.ones(len(buffer), dtype=bool)
+        text[offsets[1:] - 1] = False
+        buffer[text] = characters
+        return buffer, offsets
+
+
+class Spec:
+    backend = 'numpy' if numpy is not None else 'python'
+
+    def __init__(self, tests, case: list):
+        self.tests = tests
+        self.case = case
+
+    def check(self, case: list) -> bool:
+        """
+        Whether the lines of a test case (bytes, as Generator.split returns them)
+        could have been generated by this spec, e.g. a permutation is still one
+        and an array still has as many numbers as its length says
+        """
+        if len(case) != len(self.case):
+            return False
+        variables = {}
+        try:
+            return all(element.check(line, variables) for element, line in zip(self.case, case))
+        except ValueError:
+            return False
+
+    def generate(self, seed: int) -> bytes:
+        if numpy is not None:
+            return self.__generate_numpy(seed)
+        return self.__generate_python(seed)
+
+    def __generate_numpy(self, seed: int) -> bytes:
+        rng = numpy.random.default_rng(seed)
+        tests = self.tests if isinstance(self.tests, int) else int(self.tests.draw_all(rng, {}, 1)[0])
+
+        variables = {}
+        columns = [element.draw_all(rng, variables, tests) for element in self.case]
+
+        # Each element formatted all its lines into one buffer; test cases take a line of each in turn
+        views = [(memoryview(buffer), offsets.tolist()) for buffer, offsets in columns]
+        chunks = [f'{tests}\n'.encode()]
+        for test in range(tests):
+            for view, offsets in views:
+                chunks.append(view[offsets[test]:offsets[test + 1]])
+        return b''.join(chunks)
+
+    def __generate_python(self, seed: int) -> bytes:
+        rng = random.Random(seed)
+        tests = self.tests if isinstance(self.tests, int) else self.tests.draw(rng, {})
+
+        lines = [str(tests)]
+        for _ in range(tests):
+            variables = {}
+            for element in self.case:
+                lines.append(element.draw(rng, variables))
+        return ('\n'.join(lines) + '\n').encode()
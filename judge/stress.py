@@ -3,13 +3,26 @@ import time
 
 from entities import *
 from judge.remo import Remo
+from judge.search import TimeSearch
+from judge.shrink import Shrinker
 
 
 class Stressor:
-    def __init__(self, problem: Problem, submission: Submission, timeout: int):
+    def __init__(
+        self, problem: Problem, submission: Submission, timeout: int, shrink: int = 0, search: int = 0,
+        max_seeds: int = None, first_seed: int = 1, purge: bool = True, progress=None
+    ):
         self.problem = problem
         self.submission = submission
         self.timeout = timeout
+        self.shrink = shrink
+        self.search = search
+        self.max_seeds = max_seeds
+        self.first_seed = first_seed
+        # False keeps a submission that was not hacked prepared for another round
+        self.purge = purge
+        # Called with every seed the submission passes
+        self.progress = progress
 
     def prepare(self):
         self.problem.prepare()
@@ -17,15 +30,16 @@ class Stressor:
         self.generator = self.problem.generator
 
     def test(self):
-        seed = 1
+        seed = self.first_seed
         start_time = time.time()
 
-        while time.time() - start_time < self.timeout:
-            stdin = self.generator.generate(seed)
-            expected_outcome = self.problem.executor.run(stdin)
-            defender_outcome = self.submission.executor.run(stdin)
+        while time.time() - start_time < self.timeout and (self.max_seeds is None or seed <= self.max_seeds):
+            stdin = self.problem.corpus.generate(seed)
+            with self.problem.corpus.input(seed, stdin) as shared_stdin:
+                expected_outcome = self.problem.expected(seed, shared_stdin)
+                defender_outcome = self.submission.executor.run(shared_stdin)
 
-            if "error" in [expected_outcome["status"], defender_outcome["status"]]:
+            if expected_outcome["status"] != "success" or defender_outcome["status"] == "error":
                 logging.error(expected_outcome.get("message", None))
                 logging.error(defender_outcome.get("message", None))
                 return {'status': 'None'}
@@ -33,9 +47,18 @@ class Stressor:
                 expected_output = expected_outcome["stdout"]
                 defender_output = defender_outcome["stdout"]
 
-                result = self.generator.validate(expected_output, defender_output)
+                # TLE, MLE and RE are as good a hack as a wrong answer
+                verdict = defender_outcome["status"]
+                if verdict == "success" and not self.generator.validate(expected_output, defender_output):
+                    verdict = "WA"
+
+                if verdict != "success":
+                    # A replayed input is an mmap of the corpus file, read only now
+                    stdin = bytes(stdin)
+                    minimal_stdin = None
+                    if self.shrink > 0:
+                        minimal_stdin = Shrinker(self.problem, self.submission, self.shrink).shrink(stdin)
 
-                if not result:
                     self.submission.executor.purge()
                     return {
                         "status": "hacked",
@@ -43,17 +66,41 @@ class Stressor:
                         "problem": self.submission.problem,
                         "generator": self.generator.__class__.__name__,
                         "seed": seed,
+                        "seeds": seed,
+                        "verdict": verdict,
+                        "difference": self.generator.difference if verdict == "WA" else None,
+                        "cpu_time": defender_outcome["cpu_time"],
+                        "memory": defender_outcome["memory"],
+                        "minimal_stdin": minimal_stdin,
                         "stdin": stdin,
                         "expected_output": expected_output,
                         "defender_output": defender_output
                     }
-                
+
+            if self.progress is not None:
+                self.progress(seed)
             seed += 1
 
-        self.submission.executor.purge()
+        if self.search > 0:
+            hack = TimeSearch(self.problem, self.submission, self.search).search()
+            if hack is not None:
+                self.submission.executor.purge()
+                return {
+                    "status": "hacked",
+                    "submission_id": self.submission.submission_id,
+                    "problem": self.submission.problem,
+                    "generator": self.generator.__class__.__name__,
+                    "seed": "search",
+                    "seeds": seed - 1,
+                    **hack
+                }
+
+        if self.purge:
+            self.submission.executor.purge()
         return {
             "status": "failed hack attempt",
             "generator": self.generator.__class__.__name__,
             "submission_id": self.submission.submission_id,
-            "problem": self.submission.problem
+            "problem": self.submission.problem,
+            "seeds": seed - 1
         }
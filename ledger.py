@@ -0,0 +1,157 @@
+import collections
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+class Ledger:
+    """
+    Durable record of how far every submission of a contest got, in SQLite.
+
+    A submission is 'running' from the moment it is handed to the stress
+    stage, 'triaged' once it survived the triage, and takes the status of its
+    verdict ('hacked', 'failed hack attempt', ...) when it is settled. The last
+    seed it passed is checkpointed every checkpoint_seeds seeds or
+    checkpoint_seconds seconds, so a restart resumes each unsettled submission
+    close to where it got and re-runs at most the seeds since the checkpoint.
+    Each process keeps one connection; the database is in WAL mode so that
+    worker processes can record progress while it is being read.
+    """
+
+    checkpoint_seeds = 64
+    checkpoint_seconds = 2
+
+    # (pid, path) -> (connection, lock). Keyed on the pid because a connection
+    # must not be used across fork; the lock serializes the threads of a process.
+    connections = {}
+
+    def __init__(self, path: str):
+        self.path = path
+        # Progress not yet written: submission id -> last seed passed
+        self.pending = {}
+        self.unsaved = 0
+        self.checkpointed = time.time()
+
+    def __open(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # Under WAL a commit still survives a crash of the process, only not a power loss
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS results (
+                submission_id INTEGER PRIMARY KEY,
+                problem TEXT,
+                status TEXT,
+                last_seed INTEGER NOT NULL DEFAULT 0,
+                verdict TEXT,
+                started_at REAL,
+                updated_at REAL,
+                finished_at REAL
+            )
+            '''
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS results_status ON results (status)')
+        connection.execute('CREATE INDEX IF NOT EXISTS results_problem ON results (problem, status)')
+        connection.commit()
+        return connection
+
+    @contextlib.contextmanager
+    def __connect(self):
+        key = (os.getpid(), self.path)
+        if key not in Ledger.connections:
+            Ledger.connections[key] = (self.__open(), threading.Lock())
+
+        connection, lock = Ledger.connections[key]
+        with lock:
+            yield connection
+
+    def settled(self) -> set:
+        with self.__connect() as connection:
+            rows = connection.execute('SELECT submission_id FROM results WHERE finished_at IS NOT NULL').fetchall()
+        return {row[0] for row in rows}
+
+    def last_seed(self, submission_id) -> int:
+        with self.__connect() as connection:
+            row = connection.execute(
+                'SELECT last_seed FROM results WHERE submission_id = ?', (int(submission_id),)
+            ).fetchone()
+        return 0 if row is None else row[0]
+
+    def start(self, submission_id, problem: str) -> None:
+        now = time.time()
+        with self.__connect() as connection, connection:
+            connection.execute(
+                '''
+                INSERT INTO results (submission_id, problem, status, started_at, updated_at) VALUES (?, ?, 'running', ?, ?)
+                ON CONFLICT (submission_id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at
+                ''',
+                (int(submission_id), problem, now, now),
+            )
+
+    def progress(self, submission_id, seed: int) -> None:
+        self.pending[int(submission_id)] = max(seed, self.pending.get(int(submission_id), 0))
+        self.unsaved += 1
+        if self.unsaved >= Ledger.checkpoint_seeds or time.time() - self.checkpointed >= Ledger.checkpoint_seconds:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """
+        Write the progress recorded since the last checkpoint
+        """
+        pending, self.pending = self.pending, {}
+        self.unsaved = 0
+        self.checkpointed = time.time()
+        if not pending:
+            return
+
+        try:
+            with self.__connect() as connection, connection:
+                connection.executemany(
+                    'UPDATE results SET last_seed = MAX(last_seed, ?), updated_at = ? WHERE submission_id = ?',
+                    [(seed, self.checkpointed, submission_id) for submission_id, seed in pending.items()],
+                )
+        except sqlite3.Error as e:
+            # Losing a progress mark only costs re-running some seeds after a restart
+            logging.error(f"Could not record the progress of submissions {sorted(pending)}: {e}")
+
+    def triaged(self, submission_id, last_seed: int = 0) -> None:
+        # The progress of the triage was checkpointed in a worker, possibly not up to its last seed
+        with self.__connect() as connection, connection:
+            connection.execute(
+                "UPDATE results SET status = 'triaged', last_seed = MAX(last_seed, ?), updated_at = ? WHERE submission_id = ?",
+                (last_seed, time.time(), int(submission_id)),
+            )
+
+    def finish(self, submission_id, verdict: dict) -> None:
+        now = time.time()
+        verdict = {key: value.decode(errors='replace') if isinstance(value, bytes) else value for key, value in verdict.items()}
+        with self.__connect() as connection, connection:
+            connection.execute(
+                '''
+                INSERT INTO results (submission_id, problem, status, verdict, started_at, updated_at, finished_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (submission_id) DO UPDATE SET
+                    status = excluded.status, verdict = excluded.verdict,
+                    updated_at = excluded.updated_at, finished_at = excluded.finished_at
+                ''',
+                (int(submission_id), verdict.get('problem'), verdict['status'], json.dumps(verdict), now, now, now),
+            )
+
+    def summary(self) -> dict:
+        """
+        Number of submissions per problem and status
+        """
+        with self.__connect() as connection:
+            rows = connection.execute('SELECT problem, status, COUNT(*) FROM results GROUP BY problem, status').fetchall()
+
+        counts = collections.defaultdict(dict)
+        for problem, status, count in rows:
+            counts[problem][status] = count
+        return dict(counts)
@@ -0,0 +1,113 @@
+import logging
+import queue
+import threading
+import traceback
+
+import fetch
+from entities import *
+
+
+class Pipeline:
+    """
+    Bounded producer/consumer pipeline in front of the stress stage.
+
+    A fetch thread downloads sources (paced by the rate limiter in fetch) and
+    keeps at most `prefetch` of them ahead of a compile thread, which turns
+    them into prepared Submission objects. Iterating over the pipeline yields
+    (problem, submission) pairs that are ready to be stress-tested, so network
+    waits overlap with stress testing instead of preceding it. Submissions
+    that never get there (not fetched, not prepared, or of a problem that is
+    not hacked) are reported to dropped with their problem code. stop() ends
+    both threads early, e.g. once the budget is spent.
+    """
+
+    __done = object()
+
+    def __init__(self, hackable_submissions, problem_mapper: dict, checked_submissions: set, prefetch: int, dropped=None):
+        self.hackable_submissions = hackable_submissions
+        self.problem_mapper = problem_mapper
+        self.checked_submissions = checked_submissions
+        self.dropped = dropped or (lambda problem_code: None)
+        self.fetched = queue.Queue(maxsize=prefetch)
+        self.ready = queue.Queue(maxsize=prefetch)
+        self.stopped = threading.Event()
+
+    def __put(self, items: queue.Queue, item) -> bool:
+        # Blocks while the queue is full, but gives up once the pipeline is stopped
+        while not self.stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __fetch(self):
+        try:
+            for submission in self.hackable_submissions:
+                if self.stopped.is_set():
+                    break
+                if submission.id in self.checked_submissions:
+                    continue
+                try:
+                    if not self.__put(self.fetched, fetch.fetch_submission(submission)):
+                        break
+                except:
+                    logging.error(f"Exception when fetching {submission.id}")
+                    logging.error(traceback.format_exc())
+                    self.dropped(submission.problem)
+        finally:
+            self.__put(self.fetched, Pipeline.__done)
+
+    def __compile(self):
+        try:
+            while True:
+                args = self.fetched.get()
+                if args is Pipeline.__done or self.stopped.is_set():
+                    break
+                try:
+                    submission = Submission(args)
+                    if submission.problem not in self.problem_mapper:
+                        self.dropped(submission.problem)
+                        continue
+                    problem = self.problem_mapper[submission.problem]
+                    submission.set_limits(problem.time_limit, problem.memory_limit)
+                    submission.prepare()
+                    if not self.__put(self.ready, (problem, submission)):
+                        submission.executor.purge()
+                        break
+                except:
+                    logging.error(f"Exception when preparing {args['submission_id']}")
+                    logging.error(traceback.format_exc())
+                    self.dropped(args['problem'])
+        finally:
+            self.__put(self.ready, Pipeline.__done)
+            if self.stopped.is_set():
+                self.__drain()
+
+    def __iter__(self):
+        threading.Thread(target=self.__fetch, name='fetch', daemon=True).start()
+        threading.Thread(target=self.__compile, name='compile', daemon=True).start()
+
+        while True:
+            item = self.ready.get()
+            if item is Pipeline.__done:
+                return
+            yield item
+
+    def __drain(self):
+        while True:
+            try:
+                item = self.ready.get_nowait()
+            except queue.Empty:
+                return
+            if item is not Pipeline.__done:
+                item[1].executor.purge()
+
+    def stop(self):
+        """
+        Stop fetching and compiling, and purge the submissions prepared but not taken
+        """
+        self.stopped.set()
+        # The compile thread drains again on its way out, in case it was just putting one
+        self.__drain()
@@ -0,0 +1,138 @@
+import collections
+import heapq
+import logging
+import math
+import threading
+import traceback
+
+import fetch
+import UTIL
+
+
+class Priority:
+    """
+    Expected value of trying to hack a submission, used to decide which ones
+    get the stress budget first.
+
+    The value of a hack grows with the problem's place in metadata.json (the
+    harder problems come first). Its chance starts from the hack rate seen so
+    far on the problem, a Beta(1, 4) prior updated with every verdict, scaled
+    by what makes a submission more fragile: a language prone to TLE (a high
+    MULTIPLIER), a run time close to the time limit on the system tests, a
+    lower rating of its author, and a later submission time in the round.
+    """
+
+    # Beta prior of the hack rate of a problem: one hack in five attempts
+    prior_hacked = 1
+    prior_judged = 5
+
+    def __init__(self, metadata: dict, problems: list):
+        self.weights = {problem.code: len(problems) - index for index, problem in enumerate(problems)}
+        self.time_limits = {problem.code: float(problem.time_limit) for problem in problems}
+        self.use_ratings = metadata.get("ratings", True)
+        self.ratings = {}
+        self.hacked = {problem.code: 0 for problem in problems}
+        self.judged = {problem.code: 0 for problem in problems}
+        self.first_time = None
+        self.last_time = None
+        self.lock = threading.Lock()
+
+    def extend(self, records: list):
+        """
+        Learn about submissions before they are scored
+        """
+        times = [record.creation_time for record in records if record.creation_time is not None]
+        if self.first_time is not None:
+            times += [self.first_time, self.last_time]
+        if times:
+            self.first_time, self.last_time = min(times), max(times)
+
+        if self.use_ratings:
+            handles = {record.handle for record in records} - set(self.ratings)
+            try:
+                self.ratings.update(fetch.fetch_ratings(sorted(handles)))
+            except:
+                logging.error("Could not fetch ratings, ordering submissions without them")
+                logging.error(traceback.format_exc())
+
+    def observe(self, problem_code: str, hacked: bool):
+        with self.lock:
+            self.judged[problem_code] = self.judged.get(problem_code, 0) + 1
+            self.hacked[problem_code] = self.hacked.get(problem_code, 0) + int(hacked)
+
+    def hack_rate(self, problem_code: str) -> float:
+        return (self.hacked.get(problem_code, 0) + Priority.prior_hacked) / (
+            self.judged.get(problem_code, 0) + Priority.prior_judged
+        )
+
+    def problem_value(self, problem_code: str) -> float:
+        """
+        The part of a score shared by every submission of a problem
+        """
+        return self.weights.get(problem_code, 1) * self.hack_rate(problem_code)
+
+    def fragility(self, record) -> float:
+        """
+        The part of a score that depends only on the submission, fixed once its author is rated
+        """
+        fragility = 1 + math.log2(UTIL.get_langauge(record.language).get('MULTIPLIER', 1)) / 4
+
+        time_limit = self.time_limits.get(record.problem)
+        if time_limit and record.time_consumed is not None:
+            fragility *= 1 + min(1, record.time_consumed / (1000 * time_limit))
+
+        rating = self.ratings.get(record.handle)
+        if rating is not None:
+            # 1 at 1500, towards 2 for beginners and 0 for the strongest
+            fragility *= 2 / (1 + 10 ** ((rating - 1500) / 800))
+
+        if record.creation_time is not None and self.last_time is not None and self.last_time > self.first_time:
+            fragility *= 1 + 0.5 * (record.creation_time - self.first_time) / (self.last_time - self.first_time)
+
+        return fragility
+
+    def score(self, record) -> float:
+        return self.problem_value(record.problem) * self.fragility(record)
+
+
+class SubmissionQueue:
+    """
+    Records in order of their Priority score, best first.
+
+    A score is the value of its problem times the fragility of the submission.
+    Only the first changes as verdicts come in, and it changes for all of the
+    problem's submissions alike, so there is a heap of fragilities per problem
+    and every pop takes the top of the problem whose best score is highest,
+    with the hack rates as they are at that moment.
+    """
+
+    def __init__(self, priority: Priority, records: list):
+        self.priority = priority
+        self.heaps = collections.defaultdict(list)
+        self.count = 0
+        self.lock = threading.Lock()
+        for record in records:
+            self.push(record)
+
+    def push(self, record):
+        with self.lock:
+            heapq.heappush(self.heaps[record.problem], (-self.priority.fragility(record), self.count, record))
+            self.count += 1
+
+    def pop(self):
+        with self.lock:
+            problems = [problem for problem, heap in self.heaps.items() if heap]
+            if not problems:
+                return None
+            best = max(problems, key=lambda problem: -self.heaps[problem][0][0] * self.priority.problem_value(problem))
+            return heapq.heappop(self.heaps[best])[-1]
+
+    def __len__(self) -> int:
+        return sum(len(heap) for heap in self.heaps.values())
+
+    def __iter__(self):
+        while True:
+            record = self.pop()
+            if record is None:
+                return
+            yield record
@@ -0,0 +1,73 @@
+import logging
+import math
+import threading
+import time
+
+
+class Scheduler:
+    """
+    Decides how long each submission is stress-tested.
+
+    With a "budget" (seconds of wall clock left for hacking) in metadata.json,
+    the time still left is split over the submissions still to be judged, in
+    proportion to the weight of their problem: problems listed first get more.
+    Time a submission does not use (it was hacked early, or stopped early) is
+    simply left for the ones after it. Without a budget every submission gets
+    the fixed "timeout".
+
+    With an "epsilon" the stress loop also stops once enough seeds passed to
+    be confident that the per-seed chance of a failure is below epsilon: if n
+    independent seeds all pass, that chance is below ln(1 / (1 - confidence)) / n
+    (the rule of three at 95% confidence), so n = ln(1 / (1 - confidence)) / epsilon
+    seeds are enough.
+    """
+
+    # Below this, compiling and a single run would not fit
+    minimum_timeout = 1
+
+    def __init__(self, metadata: dict, problems: list, pending_submissions: list, workers: int = 1, start: float = None):
+        self.timeout = metadata["timeout"]
+        self.budget = metadata.get("budget", 0)
+        self.workers = workers
+        self.deadline = (start or time.time()) + self.budget
+
+        self.weights = {problem.code: len(problems) - index for index, problem in enumerate(problems)}
+        self.pending_weight = sum(self.weights.get(submission.problem, 1) for submission in pending_submissions)
+        self.lock = threading.Lock()
+
+        self.max_seeds = None
+        epsilon = metadata.get("epsilon", 0)
+        if epsilon > 0:
+            confidence = metadata.get("confidence", 0.95)
+            self.max_seeds = math.ceil(math.log(1 / (1 - confidence)) / epsilon)
+
+    def spent(self) -> bool:
+        return self.budget > 0 and self.deadline - time.time() < Scheduler.minimum_timeout
+
+    def remove(self, problem_code: str):
+        """
+        A pending submission was settled without being allocated any time
+        """
+        with self.lock:
+            self.pending_weight = max(0, self.pending_weight - self.weights.get(problem_code, 1))
+
+    def allocate(self, problem_code: str) -> float:
+        """
+        Seconds of stress testing for the next submission of a problem, 0 once the budget is spent
+        """
+        if self.budget <= 0:
+            return self.timeout
+
+        weight = self.weights.get(problem_code, 1)
+        with self.lock:
+            # Workers judge side by side, so the wall clock left is worth that many times over
+            remaining = self.deadline - time.time()
+            share = remaining * self.workers * weight / max(self.pending_weight, weight)
+            self.pending_weight = max(0, self.pending_weight - weight)
+
+        if self.spent():
+            return 0
+
+        timeout = min(self.timeout, max(Scheduler.minimum_timeout, share))
+        logging.info(f"Allocated {timeout:.1f}s to a submission of problem {problem_code}, {remaining:.0f}s of the budget left")
+        return timeout
@@ -0,0 +1,53 @@
+import contextlib
+import json
+import os
+import sqlite3
+import time
+
+
+class SourceStore:
+    """
+    Local SQLite store of fetched submissions, keyed by submission id.
+
+    fetch consults it before going to the network, so resuming a contest
+    never downloads the same source twice. Submissions keep their language
+    by name only; fetch looks its settings up again when loading them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.initialized = False
+
+    def __connect(self) -> sqlite3.Connection:
+        if not self.initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self.initialized:
+            connection.execute(
+                '''
+                CREATE TABLE IF NOT EXISTS submissions (
+                    submission_id INTEGER PRIMARY KEY,
+                    contest_id INTEGER,
+                    fetched_at REAL,
+                    payload TEXT
+                )
+                '''
+            )
+            connection.commit()
+            self.initialized = True
+        return connection
+
+    def get(self, submission_id) -> dict:
+        with contextlib.closing(self.__connect()) as connection:
+            row = connection.execute(
+                'SELECT payload FROM submissions WHERE submission_id = ?', (int(submission_id),)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def put(self, submission: dict) -> None:
+        with contextlib.closing(self.__connect()) as connection, connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO submissions VALUES (?, ?, ?, ?)',
+                (int(submission['submission_id']), int(submission['contest_id']), time.time(), json.dumps(submission)),
+            )